@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure des performances de la chaîne de conversion BattleScribe
+Chronomètre read_cat_file, parse_xml_to_dict, BattleScribeTransformer.transform_data
+et test_transformation.compare_structures sur chaque catalogue, et compare les
+résultats à une référence enregistrée (échec si une métrique régresse)
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import contextlib
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+import convert_xml
+import reporting
+import test_transformation
+from transform_battlescribe import BattleScribeTransformer, GAME_SYSTEM_NAME
+from catalogue_registry import CatalogueRegistry
+
+BENCHMARKS = ("read_cat_file", "parse_xml_to_dict", "transform_data", "compare_structures")
+
+# Métriques comparées à la référence : (nom, True si plus grand = meilleur)
+COMPARED_METRICS = (
+    ("mb_per_s", True),
+    ("entries_per_s", True),
+    ("peak_rss_mb", False),
+)
+
+def count_entries(tree: Dict[str, Any]) -> int:
+    """Nombre de sharedSelectionEntries d'un arbre converti"""
+    return len(convert_xml.get_collection(tree, "sharedSelectionEntries", "selectionEntry"))
+
+def best_time(func, repeat: int) -> Tuple[float, Any]:
+    """Meilleur temps sur repeat exécutions, et le résultat de la dernière"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def load_tree(cat_file: Path, json_dir: Path) -> Dict[str, Any]:
+    """Arbre d'un catalogue : dump JSON de SourceIntoJsonFormat s'il existe, sinon le .cat"""
+    json_file = json_dir / (cat_file.stem + ".json")
+    if json_file.exists():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return convert_xml.read_cat_file(str(cat_file)) or {}
+
+def bench_read_cat_file(cat_file: Path, options: Dict[str, Any]) -> Tuple[float, int, int]:
+    seconds, tree = best_time(lambda: convert_xml.read_cat_file(str(cat_file)), options["repeat"])
+    return seconds, cat_file.stat().st_size, count_entries(tree or {})
+
+def bench_parse_xml_to_dict(cat_file: Path, options: Dict[str, Any]) -> Tuple[float, int, int]:
+    # Seule la conversion de l'arbre est mesurée, pas la lecture XML
+    root = ET.parse(str(cat_file)).getroot()
+    seconds, tree = best_time(lambda: convert_xml.parse_xml_to_dict(root), options["repeat"])
+    return seconds, cat_file.stat().st_size, count_entries(tree)
+
+def make_transformer(cat_file: Path, options: Dict[str, Any]) -> BattleScribeTransformer:
+    """Transformateur silencieux sur l'arbre déjà chargé (seule l'extraction est mesurée)"""
+    state = options["state"]
+    transformer = BattleScribeTransformer(str(cat_file), "", source_data=state["trees"][cat_file.stem],
+                                          registry=state["registry"],
+                                          reporter=reporting.Reporter(reporting.QUIET, show_progress=False))
+    transformer.shared_rules = set(state["shared_rules"])
+    transformer.profile_types = state["profile_types"]
+    return transformer
+
+def bench_transform_data(cat_file: Path, options: Dict[str, Any]) -> Tuple[float, int, int]:
+    tree = options["state"]["trees"][cat_file.stem]
+    seconds, _ = best_time(lambda: make_transformer(cat_file, options).transform_data(), options["repeat"])
+    return seconds, len(json.dumps(tree, ensure_ascii=False).encode('utf-8')), count_entries(tree)
+
+def bench_compare_structures(cat_file: Path, options: Dict[str, Any]) -> Tuple[float, int, int]:
+    transformed = make_transformer(cat_file, options).transform_data()
+    reference = options["state"]["reference"]
+    
+    def compare():
+        # compare_structures affiche des compteurs : sortie ignorée
+        with contextlib.redirect_stdout(io.StringIO()):
+            return test_transformation.compare_structures(transformed, reference)
+    
+    seconds, _ = best_time(compare, options["repeat"])
+    size = len(json.dumps(transformed, ensure_ascii=False).encode('utf-8'))
+    return seconds, size, len(transformed.get("datasheets", [])) + len(transformed.get("enhancements", []))
+
+BENCH_FUNCTIONS = {
+    "read_cat_file": bench_read_cat_file,
+    "parse_xml_to_dict": bench_parse_xml_to_dict,
+    "transform_data": bench_transform_data,
+    "compare_structures": bench_compare_structures,
+}
+
+def prepare_state(files: List[Path], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Charge une fois les arbres, le système de jeu et l'index pour les bancs de transformation"""
+    json_dir = Path(options["json_dir"])
+    trees = {cat_file.stem: load_tree(cat_file, json_dir) for cat_file in files}
+    registry = None
+    if options["links"]:
+        registry = CatalogueRegistry.from_directory(str(json_dir)) if json_dir.is_dir() else CatalogueRegistry()
+        # Catalogues sans dump JSON (ex. catalogues synthétiques)
+        for stem, tree in trees.items():
+            registry.add_catalogue(tree, stem)
+    
+    game_system_file = json_dir / f"{GAME_SYSTEM_NAME}.json"
+    if not game_system_file.exists():
+        game_system_file = Path(options["cat_dir"]) / f"{GAME_SYSTEM_NAME}.gst"
+    loader = BattleScribeTransformer(str(game_system_file), "", game_system_file=str(game_system_file),
+                                     reporter=reporting.Reporter(reporting.QUIET, show_progress=False))
+    loader.load_shared_rules()
+    
+    return {
+        "trees": trees,
+        "registry": registry,
+        "shared_rules": loader.shared_rules,
+        "profile_types": loader.profile_types,
+        "reference": test_transformation.load_json_file(options["reference"])
+    }
+
+def run_benchmark(name: str, files: List[Path], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Exécute un banc sur tous les fichiers (dans un processus dédié, pour mesurer son pic RSS)"""
+    convert_xml.set_backend(options["backend"])
+    if name in ("transform_data", "compare_structures"):
+        options = {**options, "state": prepare_state(files, options)}
+    
+    func = BENCH_FUNCTIONS[name]
+    per_file = {}
+    total_seconds = 0.0
+    total_bytes = 0
+    total_entries = 0
+    for cat_file in files:
+        seconds, size, entries = func(cat_file, options)
+        per_file[cat_file.name] = {
+            "seconds": round(seconds, 6),
+            "bytes": size,
+            "entries": entries,
+            "mb_per_s": round(size / 1024 / 1024 / seconds, 3) if seconds else 0.0,
+            "entries_per_s": round(entries / seconds, 1) if seconds else 0.0
+        }
+        total_seconds += seconds
+        total_bytes += size
+        total_entries += entries
+    
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / 1024 / 1024 if sys.platform == "darwin" else peak_rss / 1024
+    
+    return {
+        "files": per_file,
+        "seconds": round(total_seconds, 6),
+        "bytes": total_bytes,
+        "entries": total_entries,
+        "mb_per_s": round(total_bytes / 1024 / 1024 / total_seconds, 3) if total_seconds else 0.0,
+        "entries_per_s": round(total_entries / total_seconds, 1) if total_seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb, 1)
+    }
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Liste les métriques qui régressent de plus de threshold % par rapport à la référence"""
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1f} %)")
+    return regressions
+
+def select_files(cat_dir: Path, pattern: Optional[str]) -> List[Path]:
+    """Catalogues (.cat puis .gst) du répertoire, filtrés par motif glob sur le nom"""
+    files = []
+    for extension in ["*.cat", "*.gst"]:
+        files.extend(sorted(cat_dir.glob(extension)))
+    if pattern:
+        files = [file_path for file_path in files if file_path.match(pattern)]
+    return files
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description='Mesure les performances de la conversion et de la transformation')
+    parser.add_argument('--cat-dir', type=str, default=str(REPO_DIR / "cat"),
+                        help='Répertoire des catalogues .cat/.gst')
+    parser.add_argument('--json-dir', type=str, default=str(REPO_DIR / "SourceIntoJsonFormat"),
+                        help='Répertoire des dumps JSON (à défaut, les .cat sont convertis)')
+    parser.add_argument('--reference', type=str, default=str(REPO_DIR / "validation" / "darkangels.json"),
+                        help='Fichier de référence de compare_structures')
+    parser.add_argument('--files', type=str, default=None, help='Motif glob des catalogues à mesurer')
+    parser.add_argument('--only', type=str, nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help='Bancs à exécuter')
+    parser.add_argument('--repeat', type=int, default=3, help='Nombre de répétitions (meilleur temps retenu)')
+    parser.add_argument('--no-links', action='store_true', help='Transformation sans index des catalogues')
+    convert_xml.add_backend_argument(parser)
+    parser.add_argument('--output', type=str, default=str(REPO_DIR / "bench" / "results.json"),
+                        help='Fichier JSON des résultats')
+    parser.add_argument('--baseline', type=str, default=None, help='Résultats de référence à comparer')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Régression tolérée en pourcentage avant échec')
+    
+    args = parser.parse_args()
+    
+    files = select_files(Path(args.cat_dir), args.files)
+    if not files:
+        print("✗ Aucun catalogue trouvé")
+        sys.exit(2)
+    
+    options = {
+        "repeat": max(1, args.repeat),
+        "cat_dir": args.cat_dir,
+        "json_dir": args.json_dir,
+        "reference": args.reference,
+        "links": not args.no_links,
+        "backend": convert_xml.resolve_backend(args.backend)
+    }
+    
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "files": len(files),
+        "repeat": options["repeat"],
+        "backend": options["backend"],
+        "benchmarks": {}
+    }
+    
+    print(f"{len(files)} catalogues, {options['repeat']} répétitions, analyseur XML : {options['backend']}")
+    print(f"{'Banc':<20} {'Total (s)':>10} {'Mo/s':>9} {'Entrées/s':>11} {'Pic RSS (Mo)':>13}")
+    for name in args.only:
+        # Un processus neuf par banc : le pic RSS mesuré est celui du banc seul
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(run_benchmark, name, files, options).result()
+        results["benchmarks"][name] = result
+        print(f"{name:<20} {result['seconds']:>10.3f} {result['mb_per_s']:>9.2f} "
+              f"{result['entries_per_s']:>11.1f} {result['peak_rss_mb']:>13.1f}")
+    
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"✓ Résultats écrits dans {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"✗ Régressions au-delà de {args.threshold} % :")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"✓ Aucune régression au-delà de {args.threshold} % par rapport à {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Générateur de catalogues BattleScribe synthétiques pour les tests de montée en charge
+Produit des .cat de la même forme que les catalogues réels (selectionEntry, profiles,
+characteristics, groupes imbriqués, entryLinks, infoLinks) avec les types de profil
+du système de jeu Warhammer 40,000, à une taille arbitraire
+"""
+
+import random
+import argparse
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+from pathlib import Path
+from typing import List
+
+NAMESPACE = "http://www.battlescribe.net/schema/catalogueSchema"
+GAME_SYSTEM_ID = "sys-352e-adc2-7639-d6a9"
+PTS_COST_TYPE_ID = "51b2-306e-1021-d207"
+
+# Types de profil du système de jeu : (typeId, nom, [(typeId de caractéristique, nom)])
+UNIT_PROFILE = ("c547-1836-d8a-ff4f", "Unit", [
+    ("e703-ecb6-5ce7-aec1", "M"), ("d29d-cf75-fc2d-34a4", "T"), ("450-a17e-9d5e-29da", "SV"),
+    ("750a-a2ec-90d3-21fe", "W"), ("58d2-b879-49c7-43bc", "LD"), ("bef7-942a-1a23-59f8", "OC"),
+])
+ABILITIES_PROFILE = ("9cc3-6d83-4dd3-9b64", "Abilities", [("9b8f-694b-e5e-b573", "Description")])
+RANGED_PROFILE = ("f77d-b953-8fa4-b762", "Ranged Weapons", [
+    ("9896-9419-16a1-92fc", "Range"), ("3bb-c35f-f54-fb08", "A"), ("94d-8a98-cf90-183e", "BS"),
+    ("2229-f494-25db-c5d3", "S"), ("9ead-8a10-520-de15", "AP"), ("a354-c1c8-a745-f9e3", "D"),
+    ("7f1b-8591-2fcf-d01c", "Keywords"),
+])
+MELEE_PROFILE = ("8a40-4aaa-c780-9046", "Melee Weapons", [
+    ("914c-b413-91e3-a132", "Range"), ("2337-daa1-6682-b110", "A"), ("95d1-95f-45b4-11d6", "WS"),
+    ("ab33-d393-96ce-ccba", "S"), ("41a0-1301-112a-e2f2", "AP"), ("3254-9fe6-d824-513e", "D"),
+    ("893f-9000-ccf7-648e", "Keywords"),
+])
+
+WORDS = ("Storm", "Iron", "Blade", "Fury", "Void", "Ash", "Crimson", "Warden", "Hunter", "Relic",
+         "Shadow", "Lance", "Bastion", "Talon", "Ember", "Oath", "Grim", "Spire", "Wrath", "Veil")
+WEAPON_KEYWORDS = ("", "Assault", "Heavy", "Pistol", "Rapid Fire 1", "Blast", "Lethal Hits", "Torrent")
+
+class CatalogueGenerator:
+    """Construit les éléments d'un catalogue synthétique de façon déterministe (graine)"""
+    
+    def __init__(self, seed: int = 0, profiles: int = 4, weapons: int = 3, depth: int = 1, links: int = 2,
+                 shared_weapons: int = 50, shared_rules: int = 20, categories: int = 10):
+        self.random = random.Random(seed)
+        self.profiles = profiles  # Profils d'aptitude par unité (en plus du profil Unit)
+        self.weapons = weapons  # Entrées d'équipement en ligne par unité
+        self.depth = depth  # Niveaux de selectionEntryGroup autour de l'équipement
+        self.links = links  # entryLinks par unité vers les armes partagées
+        self.shared_weapon_ids = [self.new_id() for _ in range(shared_weapons)]
+        self.shared_rule_ids = [self.new_id() for _ in range(shared_rules)]
+        self.category_ids = [self.new_id() for _ in range(categories)]
+        self.unit_index = 0
+    
+    def new_id(self) -> str:
+        """Identifiant au format BattleScribe (quatre groupes hexadécimaux)"""
+        return "-".join(f"{self.random.getrandbits(16):x}" for _ in range(4))
+    
+    def new_name(self, words: int = 2) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(words))
+    
+    def profile(self, parent: ET.Element, profile_type, name: str, values: List[str]):
+        type_id, type_name, characteristic_types = profile_type
+        profile = ET.SubElement(parent, "profile", name=name, typeId=type_id, typeName=type_name,
+                                hidden="false", id=self.new_id())
+        characteristics = ET.SubElement(profile, "characteristics")
+        for (characteristic_id, characteristic_name), value in zip(characteristic_types, values):
+            characteristic = ET.SubElement(characteristics, "characteristic", name=characteristic_name,
+                                           typeId=characteristic_id)
+            characteristic.text = value
+    
+    def weapon_entry(self, parent: ET.Element, entry_id: str):
+        """selectionEntry d'arme portant un profil de tir ou de mêlée"""
+        name = self.new_name()
+        entry = ET.SubElement(parent, "selectionEntry", {"type": "upgrade", "import": "true", "name": name,
+                                                         "hidden": "false", "id": entry_id})
+        profiles = ET.SubElement(entry, "profiles")
+        if self.random.random() < 0.5:
+            self.profile(profiles, RANGED_PROFILE, name, [
+                f'{self.random.choice((12, 18, 24, 36))}"', str(self.random.randint(1, 6)),
+                f"{self.random.randint(2, 5)}+", str(self.random.randint(3, 10)),
+                f"-{self.random.randint(0, 3)}", str(self.random.randint(1, 3)),
+                self.random.choice(WEAPON_KEYWORDS)
+            ])
+        else:
+            self.profile(profiles, MELEE_PROFILE, name, [
+                "Melee", str(self.random.randint(1, 6)), f"{self.random.randint(2, 5)}+",
+                str(self.random.randint(3, 10)), f"-{self.random.randint(0, 3)}",
+                str(self.random.randint(1, 3)), self.random.choice(WEAPON_KEYWORDS)
+            ])
+        return entry
+    
+    def wargear(self, parent: ET.Element, level: int):
+        """Équipement en ligne, enveloppé dans level niveaux de selectionEntryGroups"""
+        if level <= 0:
+            entries = ET.SubElement(parent, "selectionEntries")
+            for _ in range(self.weapons):
+                self.weapon_entry(entries, self.new_id())
+            return
+        groups = ET.SubElement(parent, "selectionEntryGroups")
+        group = ET.SubElement(groups, "selectionEntryGroup", name="Wargear", hidden="false", id=self.new_id())
+        self.wargear(group, level - 1)
+    
+    def unit_entry(self) -> ET.Element:
+        """selectionEntry de type model, comme les datasheets des catalogues réels"""
+        self.unit_index += 1
+        name = f"{self.new_name()} {self.unit_index}"
+        entry = ET.Element("selectionEntry", {"type": "model", "import": "true", "name": name, "hidden": "false",
+                                              "id": self.new_id()})
+        
+        profiles = ET.SubElement(entry, "profiles")
+        self.profile(profiles, UNIT_PROFILE, name, [
+            f'{self.random.randint(5, 12)}"', str(self.random.randint(3, 12)), f"{self.random.randint(2, 6)}+",
+            str(self.random.randint(1, 16)), f"{self.random.randint(6, 8)}+", str(self.random.randint(0, 5))
+        ])
+        for _ in range(self.profiles):
+            self.profile(profiles, ABILITIES_PROFILE, self.new_name(3),
+                         [" ".join(self.random.choice(WORDS).lower() for _ in range(30)) + "."])
+        
+        category_links = ET.SubElement(entry, "categoryLinks")
+        for index, category_id in enumerate(self.random.sample(self.category_ids, min(3, len(self.category_ids)))):
+            ET.SubElement(category_links, "categoryLink", targetId=category_id, id=self.new_id(),
+                          primary="true" if index == 0 else "false", name=f"Category {category_id}")
+        
+        if self.shared_rule_ids:
+            info_links = ET.SubElement(entry, "infoLinks")
+            for rule_id in self.random.sample(self.shared_rule_ids, min(2, len(self.shared_rule_ids))):
+                ET.SubElement(info_links, "infoLink", name=f"Rule {rule_id}", hidden="false", type="rule",
+                              id=self.new_id(), targetId=rule_id)
+        
+        if self.weapons:
+            self.wargear(entry, self.depth)
+        
+        if self.links and self.shared_weapon_ids:
+            entry_links = ET.SubElement(entry, "entryLinks")
+            for weapon_id in self.random.sample(self.shared_weapon_ids, min(self.links, len(self.shared_weapon_ids))):
+                ET.SubElement(entry_links, "entryLink", {"import": "true", "name": f"Weapon {weapon_id}",
+                                                         "hidden": "false", "type": "selectionEntry",
+                                                         "id": self.new_id(), "targetId": weapon_id})
+        
+        costs = ET.SubElement(entry, "costs")
+        ET.SubElement(costs, "cost", name="pts", typeId=PTS_COST_TYPE_ID, value=str(self.random.randint(2, 60) * 5))
+        return entry
+    
+    def shared_rule(self, rule_id: str) -> ET.Element:
+        rule = ET.Element("rule", name=f"Rule {rule_id}", id=rule_id, hidden="false")
+        description = ET.SubElement(rule, "description")
+        description.text = " ".join(self.random.choice(WORDS).lower() for _ in range(40)) + "."
+        return rule
+    
+    def category_entry(self, category_id: str) -> ET.Element:
+        return ET.Element("categoryEntry", name=f"Category {category_id}", id=category_id, hidden="false")
+
+def write_element(f, element: ET.Element, level: int):
+    """Écrit un élément indenté à la profondeur donnée (sans garder le document en mémoire)"""
+    ET.indent(element, space="  ", level=level)
+    f.write(("  " * level + ET.tostring(element, encoding="unicode") + "\n").encode('utf-8'))
+
+def generate(output_file: str, name: str, units: int, target_mb: float = 0.0, seed: int = 0, **options) -> int:
+    """Écrit un catalogue synthétique et retourne le nombre d'unités générées
+    
+    Les unités sont sérialisées une à une : la mémoire reste constante quelle que
+    soit la taille demandée. Avec target_mb, la génération continue jusqu'à
+    atteindre cette taille (et au moins units unités).
+    """
+    generator = CatalogueGenerator(seed, **options)
+    target_bytes = int(target_mb * 1024 * 1024)
+    
+    # Fichier binaire : tell() y est exact et peu coûteux
+    with open(output_file, 'wb') as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+        f.write(f'<catalogue xmlns="{NAMESPACE}" library="false" id="{generator.new_id()}" '
+                f'name={quoteattr(name)} gameSystemId="{GAME_SYSTEM_ID}" gameSystemRevision="1" revision="1" '
+                f'battleScribeVersion="2.03" type="catalogue">\n'.encode('utf-8'))
+        
+        f.write(b"  <categoryEntries>\n")
+        for category_id in generator.category_ids:
+            write_element(f, generator.category_entry(category_id), 2)
+        f.write(b"  </categoryEntries>\n")
+        
+        f.write(b"  <sharedSelectionEntries>\n")
+        count = 0
+        while count < units or f.tell() < target_bytes:
+            write_element(f, generator.unit_entry(), 2)
+            count += 1
+        # Armes partagées, cibles des entryLinks
+        for weapon_id in generator.shared_weapon_ids:
+            placeholder = ET.Element("root")
+            write_element(f, generator.weapon_entry(placeholder, weapon_id), 2)
+        f.write(b"  </sharedSelectionEntries>\n")
+        
+        f.write(b"  <sharedRules>\n")
+        for rule_id in generator.shared_rule_ids:
+            write_element(f, generator.shared_rule(rule_id), 2)
+        f.write(b"  </sharedRules>\n")
+        
+        f.write(b"</catalogue>\n")
+    return count
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description='Génère des catalogues BattleScribe synthétiques (.cat)')
+    parser.add_argument('--output', type=str, default='bench/synthetic/Synthetic.cat', help='Fichier .cat produit')
+    parser.add_argument('--name', type=str, default='Synthetic', help='Nom du catalogue')
+    parser.add_argument('--units', type=int, default=200, help="Nombre d'unités (selectionEntry de type model)")
+    parser.add_argument('--target-mb', type=float, default=0.0,
+                        help="Taille visée en Mo : ajoute des unités jusqu'à l'atteindre")
+    parser.add_argument('--profiles', type=int, default=4, help="Profils d'aptitude par unité")
+    parser.add_argument('--weapons', type=int, default=3, help="Entrées d'équipement en ligne par unité")
+    parser.add_argument('--depth', type=int, default=1, help="Niveaux de selectionEntryGroup autour de l'équipement")
+    parser.add_argument('--links', type=int, default=2, help='entryLinks par unité vers les armes partagées')
+    parser.add_argument('--shared-weapons', type=int, default=50, help='Nombre d\'armes partagées')
+    parser.add_argument('--seed', type=int, default=0, help='Graine du générateur (sortie reproductible)')
+    
+    args = parser.parse_args()
+    
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    units = generate(args.output, args.name, args.units, args.target_mb, args.seed, profiles=args.profiles,
+                     weapons=args.weapons, depth=args.depth, links=args.links,
+                     shared_weapons=args.shared_weapons)
+    size_mb = Path(args.output).stat().st_size / 1024 / 1024
+    print(f"✓ {args.output}: {units} unités, {size_mb:.1f} Mo")
+
+if __name__ == "__main__":
+    main()
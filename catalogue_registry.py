@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Index global des catalogues BattleScribe
+Charge tous les catalogues une seule fois et résout les entryLink/infoLink/catalogueLink
+par identifiant, quel que soit le catalogue (bibliothèque, système de jeu) qui les définit
+"""
+
+import contextlib
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Set
+
+import convert_xml
+import reporting
+
+# Collections partagées indexées par identifiant (cibles des entryLink/infoLink)
+SHARED_COLLECTIONS = convert_xml.SHARED_COLLECTIONS
+
+def load_catalogue_file(file_path: str) -> Dict[str, Any]:
+    """Charge un catalogue depuis un .cat/.gst zippé ou non (en flux) ou depuis son dump JSON (ou son sidecar)"""
+    if convert_xml.is_xml_source(file_path):
+        projection = convert_xml.PROJECTION_PRESETS["transformer"]
+        return convert_xml.read_cat_file(file_path, normalize=True, projection=projection) or {}
+    return convert_xml.load_json(file_path)
+
+def catalogue_files(directory: str) -> Dict[str, Path]:
+    """Fichier de chaque catalogue d'un répertoire, par identifiant (racines seules lues)"""
+    files = {}
+    for file_path in convert_xml.list_catalogues(directory):
+        try:
+            catalogue_id = convert_xml.read_root_attributes(file_path).get("id")
+        except Exception:
+            continue  # Fichier illisible : signalé s'il est chargé
+        if catalogue_id and catalogue_id not in files:
+            files[catalogue_id] = file_path
+    return files
+
+class CatalogueRegistry:
+    """Index id → nœud construit une seule fois sur l'ensemble des catalogues"""
+    
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {}  # id de nœud partagé -> nœud
+        self.node_catalogue: Dict[str, str] = {}  # id de nœud partagé -> id du catalogue
+        self.catalogues: Dict[str, Dict[str, Any]] = {}  # id de catalogue -> arbre
+        self.files: Dict[str, str] = {}  # nom de fichier sans extension -> id du catalogue
+        self.resolved: Optional[Set[str]] = None  # Identifiants résolus (voir tracking)
+    
+    @classmethod
+    def from_directory(cls, directory: str) -> "CatalogueRegistry":
+        """Construit le registre à partir de tous les catalogues d'un répertoire"""
+        registry = cls()
+        for file_path in sorted(Path(directory).iterdir()):
+            if file_path.name.startswith('.'):
+                continue
+            if not (convert_xml.is_json_dump(file_path) or convert_xml.is_xml_source(file_path)):
+                continue
+            registry.add_file(file_path)
+        return registry
+    
+    @classmethod
+    def from_source(cls, directory: str, source_file: str,
+                    source_data: Optional[Dict[str, Any]] = None) -> "CatalogueRegistry":
+        """Construit le registre d'une seule faction
+        
+        Seuls la source, son système de jeu (gameSystemId) et les catalogues
+        atteints de proche en proche par ses catalogueLinks sont chargés ; des
+        autres fichiers du répertoire, seuls les attributs de la racine sont lus
+        pour retrouver le fichier de chaque catalogue lié. source_data évite de
+        relire une source déjà chargée.
+        """
+        registry = cls()
+        files = None  # id de catalogue -> fichier, construit au premier lien
+        pending = [Path(source_file)]
+        loaded = set()
+        while pending:
+            file_path = pending.pop()
+            if file_path in loaded:
+                continue
+            loaded.add(file_path)
+            if source_data is not None and file_path == Path(source_file):
+                data = source_data
+                registry.add_catalogue(data, convert_xml.dump_stem(file_path))
+            else:
+                data = registry.add_file(file_path)
+            if data is None:
+                continue
+            
+            targets = [link.get("targetId") for link in convert_xml.get_collection(data, "catalogueLinks", "catalogueLink")]
+            targets.append(data.get("gameSystemId"))
+            for target_id in targets:
+                if not target_id or target_id in registry.catalogues:
+                    continue
+                if files is None:
+                    files = catalogue_files(directory)
+                if target_id in files:
+                    pending.append(files[target_id])
+        return registry
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    def add_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Charge et indexe un fichier de catalogue ; retourne sa racine (None en cas d'échec)"""
+        try:
+            data = load_catalogue_file(str(file_path))
+        except Exception as e:
+            reporting.get_reporter().error(f"⚠ Catalogue ignoré {file_path.name}: {e}")
+            return None
+        self.add_catalogue(data, convert_xml.dump_stem(file_path))
+        return data
+    
+    def add_catalogue(self, data: Dict[str, Any], file_stem: Optional[str] = None):
+        """Indexe les collections partagées d'un catalogue"""
+        catalogue_id = data.get("id")
+        if not catalogue_id:
+            return
+        self.catalogues[catalogue_id] = data
+        if file_stem:
+            self.files[file_stem] = catalogue_id
+        
+        for container_key, item_key in SHARED_COLLECTIONS:
+            for node in convert_xml.get_collection(data, container_key, item_key):
+                node_id = node.get("id") if isinstance(node, dict) else None
+                # En cas de doublon, la première définition l'emporte
+                if node_id and node_id not in self.nodes:
+                    self.nodes[node_id] = node
+                    self.node_catalogue[node_id] = catalogue_id
+    
+    def catalogue_for_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Retourne l'arbre déjà chargé correspondant à un fichier (par nom)"""
+        catalogue_id = self.files.get(convert_xml.dump_stem(file_path))
+        return self.catalogues.get(catalogue_id) if catalogue_id else None
+    
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne le nœud partagé d'identifiant donné"""
+        return self.nodes.get(node_id)
+    
+    @contextlib.contextmanager
+    def tracking(self):
+        """Enregistre les identifiants des nœuds résolus pendant un bloc
+        
+        Le bloc reçoit l'ensemble des targetId résolus par resolve (et donc par
+        iter_entries, iter_profiles et describe), y compris ceux restés sans
+        cible : le résultat d'une extraction ne dépend que de ces nœuds.
+        """
+        previous, self.resolved = self.resolved, set()
+        try:
+            yield self.resolved
+        finally:
+            self.resolved = previous
+    
+    def resolve(self, link: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Résout la cible d'un entryLink, infoLink ou catalogueLink"""
+        target_id = link.get("targetId")
+        if not target_id:
+            return None
+        if link.get("type") == "catalogue":
+            return self.catalogues.get(target_id)
+        if self.resolved is not None:
+            self.resolved.add(target_id)
+        return self.get(target_id)
+    
+    def iter_entries(self, node: Dict[str, Any], _visited: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Parcourt les selectionEntries accessibles depuis un nœud
+        
+        Suit les selectionEntryGroups (en ligne ou liés) et les entryLinks, sans
+        descendre dans les sous-entrées des entrées rencontrées. Chaque cible liée
+        n'est visitée qu'une fois, ce qui protège des cycles.
+        """
+        visited = _visited if _visited is not None else {node.get("id")}
+        
+        for entry in convert_xml.get_collection(node, "selectionEntries", "selectionEntry"):
+            yield entry
+        
+        for group in convert_xml.get_collection(node, "selectionEntryGroups", "selectionEntryGroup"):
+            yield from self.iter_entries(group, visited)
+        
+        for link in convert_xml.get_collection(node, "entryLinks", "entryLink"):
+            target = self.resolve(link)
+            if target is None or target.get("id") in visited:
+                continue
+            visited.add(target.get("id"))
+            if link.get("type") == "selectionEntryGroup":
+                yield from self.iter_entries(target, visited)
+            else:
+                yield target
+    
+    def iter_profiles(self, node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Parcourt les profils d'un nœud, y compris ceux référencés par infoLink"""
+        yield from convert_xml.get_collection(node, "profiles", "profile")
+        
+        for link in convert_xml.get_collection(node, "infoLinks", "infoLink"):
+            if link.get("type") == "profile":
+                target = self.resolve(link)
+                if target is not None:
+                    yield target
+    
+    def describe(self, link: Dict[str, Any]) -> str:
+        """Retourne la description de la règle ou du profil ciblé par un infoLink"""
+        target = self.resolve(link)
+        if target is None:
+            return ""
+        if "description" in target:
+            description = target["description"]
+            return description if isinstance(description, str) else ""
+        for characteristic in convert_xml.get_collection(target, "characteristics", "characteristic"):
+            if characteristic.get("name") == "Description":
+                return characteristic.get("_text", "")
+        return ""
+
+class StoreRegistry(CatalogueRegistry):
+    """Registre paresseux adossé aux magasins par entrée des dumps JSON
+    
+    Seuls les index des magasins sont chargés : chaque nœud partagé n'est lu
+    qu'au moment où un lien le résout. catalogues ne contient que les attributs
+    de la racine de chaque catalogue (id, name, revision...). Avec from_source,
+    seuls les magasins de la faction, de son système de jeu et de ses catalogues
+    liés sont ouverts. Chaque magasin garde son fichier ouvert jusqu'à close (ou
+    la sortie du bloc with).
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.stores: Dict[str, convert_xml.EntryStore] = {}  # id de catalogue -> magasin
+        self.missing: List[str] = []  # Catalogues sans magasin à jour (sources XML comprises)
+    
+    def add_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Ouvre et indexe le magasin d'un dump JSON ; retourne sa racine allégée
+        
+        Une source XML ou un dump sans magasin à jour est noté dans missing (None).
+        """
+        store = None if convert_xml.is_xml_source(file_path) else convert_xml.EntryStore.open(file_path)
+        if store is None:
+            self.missing.append(file_path.name)
+            return None
+        self.add_store(store, convert_xml.dump_stem(file_path))
+        return store.catalogue
+    
+    def __len__(self) -> int:
+        return len(self.node_catalogue)
+    
+    def __enter__(self) -> "StoreRegistry":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Ferme les fichiers des magasins (les nœuds déjà lus restent en mémoire)"""
+        for store in self.stores.values():
+            store.close()
+    
+    def add_store(self, store: convert_xml.EntryStore, file_stem: Optional[str] = None):
+        """Indexe les identifiants d'un magasin (sans lire les nœuds)"""
+        catalogue_id = store.catalogue.get("id")
+        if not catalogue_id:
+            return
+        self.stores[catalogue_id] = store
+        self.catalogues[catalogue_id] = store.catalogue
+        if file_stem:
+            self.files[file_stem] = catalogue_id
+        for node_id in store.entries:
+            # En cas de doublon, la première définition l'emporte
+            if node_id not in self.node_catalogue:
+                self.node_catalogue[node_id] = catalogue_id
+    
+    def store_for_file(self, file_path: str) -> Optional[convert_xml.EntryStore]:
+        """Magasin correspondant à un fichier (par nom)"""
+        catalogue_id = self.files.get(convert_xml.dump_stem(file_path))
+        return self.stores.get(catalogue_id) if catalogue_id else None
+    
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne le nœud partagé d'identifiant donné, lu à la demande"""
+        catalogue_id = self.node_catalogue.get(node_id)
+        return self.stores[catalogue_id].get(node_id) if catalogue_id else None
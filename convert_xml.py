@@ -1,7 +1,189 @@
+import io
 import os
+import gc
+import sys
+import gzip
 import json
+import lzma
+import pickle
+import zipfile
+import argparse
+import hashlib
+import time
+import contextlib
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import reporting
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml est optionnel : repli sur ElementTree
+    lxml_etree = None
+
+# Version du format de sortie : l'incrémenter invalide le manifeste
+CONVERTER_VERSION = "1"
+MANIFEST_NAME = ".manifest.json"
+
+# Sidecar binaire écrit à côté de chaque dump JSON (chargement environ deux fois plus rapide)
+SIDECAR_SUFFIX = ".pickle"
+SIDECAR_VERSION = 1
+
+# Magasin par entrée : index id/nom -> position, puis un pickle par nœud partagé
+ENTRY_STORE_SUFFIX = ".entries"
+ENTRY_STORE_VERSION = 1
+
+# Collections partagées indexées par identifiant (cibles des entryLink/infoLink)
+SHARED_COLLECTIONS = (
+    ("sharedSelectionEntries", "selectionEntry"),
+    ("sharedSelectionEntryGroups", "selectionEntryGroup"),
+    ("sharedProfiles", "profile"),
+    ("sharedRules", "rule"),
+    ("sharedInfoGroups", "infoGroup"),
+    ("categoryEntries", "categoryEntry"),
+)
+
+# Formats de sortie JSON et compressions (bibliothèque standard uniquement)
+OUTPUT_FORMATS = ("pretty", "compact")
+COMPRESSIONS = {
+    "gzip": ".gz",
+    "xz": ".xz",
+}
+# Signatures reconnues à la lecture : le format est détecté, pas déduit du nom
+COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", gzip.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+)
+JSON_SUFFIXES = (".json.gz", ".json.xz", ".json")
+
+# Sources XML : catalogues en clair et archives zip distribuées par BattleScribe
+# (archive -> extension du document qu'elle contient)
+ZIPPED_SUFFIXES = {
+    ".catz": ".cat",
+    ".gstz": ".gst",
+    ".rosz": ".ros",
+}
+XML_SUFFIXES = (".cat", ".gst") + tuple(ZIPPED_SUFFIXES)
+
+# Conteneurs BattleScribe connus et le tag de leurs éléments : en mode normalisé,
+# ces collections sont toujours émises sous forme de liste, même à un seul élément
+COLLECTION_TAGS = {
+    "associations": "association",
+    "catalogueLinks": "catalogueLink",
+    "categoryEntries": "categoryEntry",
+    "categoryLinks": "categoryLink",
+    "characteristicTypes": "characteristicType",
+    "characteristics": "characteristic",
+    "conditionGroups": "conditionGroup",
+    "conditions": "condition",
+    "constraints": "constraint",
+    "costTypes": "costType",
+    "costs": "cost",
+    "entryLinks": "entryLink",
+    "forceEntries": "forceEntry",
+    "infoGroups": "infoGroup",
+    "infoLinks": "infoLink",
+    "localConditionGroups": "localConditionGroup",
+    "modifierGroups": "modifierGroup",
+    "modifiers": "modifier",
+    "profileTypes": "profileType",
+    "profiles": "profile",
+    "publications": "publication",
+    "repeats": "repeat",
+    "rules": "rule",
+    "selectionEntries": "selectionEntry",
+    "selectionEntryGroups": "selectionEntryGroup",
+    "sharedInfoGroups": "infoGroup",
+    "sharedProfiles": "profile",
+    "sharedRules": "rule",
+    "sharedSelectionEntries": "selectionEntry",
+    "sharedSelectionEntryGroups": "selectionEntryGroup",
+}
+
+# Sous-arbres jamais convertis (comportement historique)
+DEFAULT_DROP_TAGS = frozenset({"modifierGroups"})
+
+# Sous-arbres que BattleScribeTransformer et l'index des catalogues ne lisent pas
+TRANSFORMER_DROP_TAGS = DEFAULT_DROP_TAGS | {
+    "associations",
+    "attributes",
+    "comment",
+    "conditionGroups",
+    "conditions",
+    "constraints",
+    "forceEntries",
+    "localConditionGroups",
+    "publications",
+    "readme",
+    "repeats",
+}
+
+class Projection:
+    """Filtre keep/drop appliqué aux tags pendant la conversion
+    
+    Un élément dont le tag est dans drop, ou absent de keep lorsque keep est
+    fourni, est ignoré avec tout son sous-arbre (l'élément racine est toujours
+    conservé).
+    """
+    
+    def __init__(self, drop=DEFAULT_DROP_TAGS, keep=None):
+        self.drop = frozenset(drop)
+        self.keep = frozenset(keep) if keep is not None else None
+    
+    def skips(self, tag):
+        return tag in self.drop or (self.keep is not None and tag not in self.keep)
+    
+    def options(self):
+        """Description de la projection pour le manifeste (vide si c'est celle par défaut)"""
+        options = {}
+        if self.drop != DEFAULT_DROP_TAGS:
+            options["drop"] = sorted(self.drop)
+        if self.keep is not None:
+            options["keep"] = sorted(self.keep)
+        return options
+
+DEFAULT_PROJECTION = Projection()
+PROJECTION_PRESETS = {
+    "full": DEFAULT_PROJECTION,
+    "transformer": Projection(drop=TRANSFORMER_DROP_TAGS),
+}
+
+# Analyseurs XML disponibles ("auto" choisit lxml s'il est installé)
+XML_BACKENDS = ("auto", "lxml", "etree")
+_backend = None  # Analyseur par défaut du processus (voir set_backend)
+
+def resolve_backend(name=None):
+    """Retourne l'analyseur effectif ("lxml" ou "etree") pour un nom d'analyseur"""
+    name = name or _backend or "auto"
+    if name == "auto":
+        return "lxml" if lxml_etree is not None else "etree"
+    if name == "lxml" and lxml_etree is None:
+        raise ValueError("l'analyseur lxml n'est pas installé (pip install lxml)")
+    if name not in XML_BACKENDS:
+        raise ValueError(f"analyseur XML inconnu : {name}")
+    return name
+
+def set_backend(name):
+    """Fixe l'analyseur par défaut du processus et retourne l'analyseur effectif"""
+    global _backend
+    _backend = resolve_backend(name)
+    return _backend
+
+def xml_iterparse(source, backend=None):
+    """Événements start/end d'un flux XML avec l'analyseur demandé
+    
+    lxml est appelé sans commentaires ni instructions de traitement et avec
+    huge_tree, pour produire les mêmes éléments qu'ElementTree.
+    """
+    if resolve_backend(backend) == "lxml":
+        return lxml_etree.iterparse(source, events=('start', 'end'), huge_tree=True,
+                                    remove_comments=True, remove_pis=True)
+    return ET.iterparse(source, events=('start', 'end'))
+
+# Cache tag brut (avec namespace) -> tag nettoyé : les tags distincts sont peu
+# nombreux, chaque élément ne coûte plus qu'une recherche dans un dictionnaire
+_TAG_NAMES = {}
 
 def clean_tag_name(tag):
     """Nettoie le nom de tag en supprimant les préfixes de namespace"""
@@ -13,101 +195,860 @@ def clean_tag_name(tag):
         return tag.replace('{http://www.battlescribe.net/schema/catalogueSchema}', '')
     return tag
 
-def parse_xml_to_dict(element):
-    """Convertit un élément XML en dictionnaire Python"""
-    result = {}
+def cached_tag_name(tag):
+    """clean_tag_name mis en cache par tag brut"""
+    name = _TAG_NAMES.get(tag)
+    if name is None:
+        name = _TAG_NAMES[tag] = clean_tag_name(tag)
+    return name
+
+def parse_xml_to_dict(element, normalize=False, projection=DEFAULT_PROJECTION):
+    """Convertit un élément XML en dictionnaire Python
     
-    # Ajoute les attributs
-    if element.attrib:
-        result.update(element.attrib)
+    Avec normalize=True, les collections listées dans COLLECTION_TAGS sont
+    toujours des listes. Les sous-arbres écartés par projection ne sont pas
+    convertis. Le parcours utilise une pile explicite : la profondeur du
+    document n'est pas limitée par la pile d'appels Python.
+    """
+    drop = projection.drop
+    keep = projection.keep
+    tag_names = _TAG_NAMES
     
-    # Traite les enfants
-    for child in element:
-        # Nettoie le nom du tag
-        clean_tag = clean_tag_name(child.tag)
-        
-        # Ignorer les éléments modifierGroups
-        if clean_tag == "modifierGroups":
-            continue
-            
-        child_data = parse_xml_to_dict(child)
+    # Pile de (itérateur sur les enfants, élément, dictionnaire, tag nettoyé)
+    stack = [(iter(element), element, dict(element.attrib), cached_tag_name(element.tag))]
+    while True:
+        children, current, result, clean_tag = stack[-1]
         
-        if clean_tag in result:
-            # Si l'élément existe déjà, le convertir en liste
-            if not isinstance(result[clean_tag], list):
-                result[clean_tag] = [result[clean_tag]]
-            result[clean_tag].append(child_data)
+        # Descendre dans le prochain enfant conservé
+        for child in children:
+            child_tag = tag_names.get(child.tag) or cached_tag_name(child.tag)
+            # Ignorer les éléments écartés (modifierGroups par défaut)
+            if child_tag in drop or (keep is not None and child_tag not in keep):
+                continue
+            stack.append((iter(child), child, dict(child.attrib), child_tag))
+            break
         else:
-            result[clean_tag] = child_data
+            # Tous les enfants sont convertis : l'élément est terminé
+            stack.pop()
+            value = finalize_element(result, current.text)
+            if not stack:
+                return value
+            parent = stack[-1]
+            force_list = normalize and COLLECTION_TAGS.get(parent[3]) == clean_tag
+            merge_child(parent[2], clean_tag, value, force_list)
+
+def get_collection(data, container_key, item_key):
+    """Retourne les éléments d'une collection (ex. profiles/profile) sous forme de liste
     
-    # Ajoute le texte si présent
-    if element.text and element.text.strip():
+    Accepte aussi bien l'arbre brut (élément unique non encapsulé) que l'arbre
+    normalisé (normalize=True), où la collection est déjà une liste.
+    """
+    container = data.get(container_key) if isinstance(data, dict) else None
+    if not isinstance(container, dict):
+        return []
+    items = container.get(item_key)
+    if items is None:
+        return []
+    return items if isinstance(items, list) else [items]
+
+def merge_child(result, clean_tag, child_data, force_list=False):
+    """Ajoute un enfant converti au dictionnaire parent (liste si le tag est répété)"""
+    if force_list and clean_tag not in result:
+        result[clean_tag] = [child_data]
+    elif clean_tag in result:
+        # Si l'élément existe déjà, le convertir en liste
+        if not isinstance(result[clean_tag], list):
+            result[clean_tag] = [result[clean_tag]]
+        result[clean_tag].append(child_data)
+    else:
+        result[clean_tag] = child_data
+
+def finalize_element(result, text):
+    """Applique la règle de texte de parse_xml_to_dict à un élément terminé"""
+    if text and text.strip():
         if result:  # S'il y a des attributs ou enfants, ajouter le texte comme valeur spéciale
-            result['_text'] = element.text.strip()
+            result['_text'] = text.strip()
         else:  # Sinon, utiliser directement le texte
-            result = element.text.strip()
-    
+            result = text.strip()
     return result
 
-def read_cat_file(file_path):
-    """Lit et parse un fichier .cat"""
-    if not file_path:
-        return
+def iterparse_xml_to_dict(source, normalize=False, projection=DEFAULT_PROJECTION, backend=None):
+    """Convertit un flux XML en dictionnaire sans construire l'arbre complet
     
-    try:
-        # Lire le fichier avec encodage UTF-8
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    Produit exactement le même résultat que parse_xml_to_dict, mais les éléments
+    sont libérés dès qu'ils sont convertis : la mémoire reste bornée par la
+    profondeur du document plutôt que par sa taille.
+    """
+    # Pile de (élément, dictionnaire, tag nettoyé) des éléments ouverts
+    stack = []
+    skip_depth = 0
+    root_result = None
+    skips = projection.skips
+    tag_names = _TAG_NAMES
+    
+    for event, element in xml_iterparse(source, backend):
+        if event == 'start':
+            if skip_depth:
+                skip_depth += 1
+                continue
+            
+            clean_tag = tag_names.get(element.tag) or cached_tag_name(element.tag)
+            
+            # Ignorer les éléments écartés par la projection (sauf la racine)
+            if stack and skips(clean_tag):
+                skip_depth = 1
+                continue
+            
+            stack.append((element, dict(element.attrib), clean_tag))
+            continue
         
-        # Supprimer le BOM UTF-8 si présent
-        content = content.replace('\ufeff', '')
+        if skip_depth:
+            skip_depth -= 1
+            if not skip_depth:
+                # Fin du sous-arbre ignoré : le retirer de son parent
+                element.clear()
+                del stack[-1][0][-1]
+            continue
         
-        # Parser le XML
-        root = ET.fromstring(content)
-        result = parse_xml_to_dict(root)
+        _, result, clean_tag = stack.pop()
+        result = finalize_element(result, element.text)
         
-        return result
+        # Libérer l'élément terminé
+        element.clear()
         
+        if stack:
+            parent = stack[-1]
+            force_list = normalize and COLLECTION_TAGS.get(parent[2]) == clean_tag
+            merge_child(parent[1], clean_tag, result, force_list)
+            del parent[0][-1]
+        else:
+            root_result = result
+    
+    return root_result
+
+def is_xml_source(file_path):
+    """Indique si un fichier est une source XML BattleScribe (.cat/.gst ou archive .catz/.gstz/.rosz)"""
+    return Path(file_path).suffix.lower() in XML_SUFFIXES
+
+def list_sources(directory):
+    """Sources XML d'un répertoire, triées par extension puis par nom"""
+    files = []
+    for suffix in XML_SUFFIXES:
+        files.extend(sorted(Path(directory).glob("*" + suffix)))
+    return files
+
+def zipped_member(archive, file_path):
+    """Document d'une archive .catz/.gstz/.rosz (le premier de l'extension attendue)"""
+    expected = ZIPPED_SUFFIXES[Path(file_path).suffix.lower()]
+    for info in archive.infolist():
+        if not info.is_dir() and info.filename.lower().endswith(expected):
+            return info
+    raise ValueError(f"aucun fichier {expected} dans l'archive {Path(file_path).name}")
+
+@contextlib.contextmanager
+def open_source(file_path):
+    """Ouvre une source XML en binaire
+    
+    Les archives zip sont lues en flux depuis leur membre, décompressé au fil de
+    la lecture : aucune copie décompressée n'est écrite sur disque.
+    """
+    if Path(file_path).suffix.lower() not in ZIPPED_SUFFIXES:
+        with open(file_path, 'rb') as f:
+            yield f
+        return
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(zipped_member(archive, file_path)) as f:
+            yield f
+
+def parse_cat_file(file_path, streaming=True, normalize=False, projection=DEFAULT_PROJECTION, backend=None):
+    """Lit et parse un fichier .cat/.gst, zippé ou non (les erreurs sont propagées)
+    
+    Par défaut le fichier est converti en flux (iterparse) ; streaming=False
+    conserve l'ancienne lecture complète en mémoire. backend choisit l'analyseur
+    (lxml ou etree, par défaut celui du processus).
+    """
+    if streaming:
+        # expat et lxml gèrent eux-mêmes le BOM UTF-8 en mode binaire
+        with open_source(file_path) as f:
+            return iterparse_xml_to_dict(f, normalize, projection, backend)
+    
+    if resolve_backend(backend) == "lxml":
+        parser = lxml_etree.XMLParser(huge_tree=True, remove_comments=True, remove_pis=True)
+        with open_source(file_path) as f:
+            root = lxml_etree.parse(f, parser).getroot()
+        return parse_xml_to_dict(root, normalize, projection)
+    
+    # Lire le fichier avec encodage UTF-8
+    with open_source(file_path) as f:
+        content = io.TextIOWrapper(f, encoding='utf-8').read()
+    
+    # Supprimer le BOM UTF-8 si présent
+    content = content.replace('\ufeff', '')
+    
+    # Parser le XML
+    root = ET.fromstring(content)
+    return parse_xml_to_dict(root, normalize, projection)
+
+def read_cat_file(file_path, streaming=True, normalize=False, projection=DEFAULT_PROJECTION, backend=None):
+    """Lit et parse un fichier .cat (None et message d'erreur en cas d'échec)"""
+    if not file_path:
+        return
+    
+    try:
+        return parse_cat_file(file_path, streaming, normalize, projection, backend)
     except Exception as e:
-        print(f"Erreur lors du traitement de {file_path}: {e}")
+        reporting.get_reporter().error(f"Erreur lors du traitement de {file_path}: {e}")
         return None
 
-def main():
-    """Fonction principale"""
+def json_suffix(compress=None):
+    """Extension des fichiers JSON produits selon la compression"""
+    return ".json" + (COMPRESSIONS[compress] if compress else "")
+
+def is_json_dump(file_path):
+    """Indique si un fichier est un dump JSON, compressé ou non"""
+    return Path(file_path).name.lower().endswith(JSON_SUFFIXES)
+
+def dump_stem(file_path):
+    """Nom d'un fichier sans ses extensions (.json, .json.gz, .json.xz, .cat...)"""
+    name = Path(file_path).name
+    for suffix in JSON_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(file_path).stem
+
+def open_output(file_path, compress=None):
+    """Ouvre un fichier texte UTF-8 en écriture, compressé en gzip ou xz si demandé"""
+    if compress == "gzip":
+        # mtime=0 : une même sortie produit toujours les mêmes octets
+        return io.TextIOWrapper(gzip.GzipFile(file_path, 'wb', mtime=0), encoding='utf-8')
+    if compress == "xz":
+        return lzma.open(file_path, 'wt', encoding='utf-8')
+    return open(file_path, 'w', encoding='utf-8')
+
+def open_input(file_path):
+    """Ouvre un fichier texte UTF-8 en lecture, compressé ou non (détecté par signature)"""
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for magic, opener in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return opener(file_path, 'rt', encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+def dump_json(data, f, output_format="pretty"):
+    """Écrit un arbre en JSON indenté (pretty) ou sans espaces (compact)"""
+    if output_format == "compact":
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    else:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def add_output_arguments(parser):
+    """Ajoute les options communes de format et de compression des sorties JSON"""
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default="pretty",
+                        help='JSON indenté (pretty, par défaut) ou sans espaces (compact)')
+    parser.add_argument('--compress', choices=sorted(COMPRESSIONS), default=None,
+                        help='Compresse les fichiers JSON produits (extension .json.gz / .json.xz)')
+
+def add_projection_arguments(parser):
+    """Ajoute les options de projection (tags conservés / écartés) à un parseur argparse"""
+    parser.add_argument('--projection', choices=sorted(PROJECTION_PRESETS), default="full",
+                        help='Préréglage de projection : full (tout sauf modifierGroups) ou transformer '
+                             '(seulement ce que lit le transformateur)')
+    parser.add_argument('--drop', nargs='+', default=[], metavar='TAG',
+                        help='Tags supplémentaires dont le sous-arbre n\'est pas converti')
+    parser.add_argument('--keep', nargs='+', default=None, metavar='TAG',
+                        help='Ne convertit que ces tags (sous la racine)')
+
+def add_backend_argument(parser):
+    """Ajoute l'option de choix de l'analyseur XML à un parseur argparse"""
+    parser.add_argument('--backend', choices=XML_BACKENDS, default="auto",
+                        help="Analyseur XML : lxml s'il est installé (auto, par défaut), lxml ou etree")
+
+def projection_from_args(args):
+    """Construit la projection des options de add_projection_arguments"""
+    preset = PROJECTION_PRESETS[args.projection]
+    if not args.drop and args.keep is None:
+        return preset
+    return Projection(drop=preset.drop | set(args.drop), keep=args.keep)
+
+def sidecar_path(json_path):
+    """Chemin du sidecar binaire associé à un dump JSON"""
+    return Path(json_path).parent / (dump_stem(json_path) + SIDECAR_SUFFIX)
+
+def intern_keys(value):
+    """Interne les clés des dictionnaires : pickle ne sérialise alors qu'une fois chaque clé"""
+    if isinstance(value, dict):
+        return {sys.intern(key): intern_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [intern_keys(item) for item in value]
+    return value
+
+def sidecar_header(json_path, format_name="battlescribe-sidecar", version=SIDECAR_VERSION):
+    """En-tête identifiant la version du format et l'état du JSON dont le sidecar est issu"""
+    json_stat = os.stat(json_path)
+    return {
+        "format": format_name,
+        "version": version,
+        "converter_version": CONVERTER_VERSION,
+        "json_size": json_stat.st_size,
+        "json_mtime_ns": json_stat.st_mtime_ns
+    }
+
+def write_sidecar(json_path, data):
+    """Écrit le sidecar (pickle protocole 5) d'un dump JSON qui vient d'être écrit
+    
+    Le fichier contient deux pickles successifs : l'en-tête, lisible seul pour
+    vérifier la fraîcheur, puis l'arbre.
+    """
+    path = sidecar_path(json_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(sidecar_header(json_path), f, protocol=5)
+        pickle.dump(intern_keys(data), f, protocol=5)
+    os.replace(tmp_path, path)
+
+def load_sidecar(json_path, header_only=False):
+    """Charge l'arbre depuis le sidecar s'il correspond encore au JSON (None sinon)
+    
+    Le sidecar est périmé dès que le JSON a changé de taille ou de date de
+    modification, ou que la version du format a changé. Seuls les sidecars
+    produits localement par le convertisseur doivent être chargés (pickle).
+    """
+    try:
+        with open(sidecar_path(json_path), 'rb') as f:
+            if pickle.load(f) != sidecar_header(json_path):
+                return None
+            return True if header_only else pickle.load(f)
+    except Exception:
+        return None
+
+def is_sidecar_fresh(json_path):
+    """Indique si le sidecar d'un dump JSON est à jour (sans charger l'arbre)"""
+    return load_sidecar(json_path, header_only=True) is True
+
+def entry_store_path(json_path):
+    """Chemin du magasin par entrée associé à un dump JSON"""
+    return Path(json_path).parent / (dump_stem(json_path) + ENTRY_STORE_SUFFIX)
+
+def entry_store_header(json_path):
+    """En-tête du magasin par entrée (même contrôle de fraîcheur que le sidecar)"""
+    return sidecar_header(json_path, "battlescribe-entries", ENTRY_STORE_VERSION)
+
+def write_entry_store(json_path, data):
+    """Écrit le magasin par entrée d'un dump JSON qui vient d'être écrit
+    
+    Le fichier contient l'en-tête, l'index puis les nœuds des collections
+    partagées, chacun dans son propre pickle. L'index associe à chaque
+    identifiant sa position (relative à la fin de l'index), sa longueur et son
+    tag, et à chaque nom la liste des identifiants qui le portent.
+    """
+    body = io.BytesIO()
+    entries = {}
+    names = {}
+    for container_key, item_key in SHARED_COLLECTIONS:
+        for node in get_collection(data, container_key, item_key):
+            node_id = node.get("id") if isinstance(node, dict) else None
+            # En cas de doublon, la première définition l'emporte (comme dans le registre)
+            if not node_id or node_id in entries:
+                continue
+            offset = body.tell()
+            pickle.dump(intern_keys(node), body, protocol=5)
+            entries[node_id] = (offset, body.tell() - offset, item_key)
+            if node.get("name"):
+                names.setdefault(node["name"], []).append(node_id)
+    
+    # Racine allégée : attributs et catalogueLinks (de quoi décrire la faction)
+    catalogue = {key: value for key, value in data.items() if not isinstance(value, (dict, list))}
+    if "catalogueLinks" in data:
+        catalogue["catalogueLinks"] = data["catalogueLinks"]
+    
+    index = {
+        "catalogue": catalogue,
+        "entries": entries,
+        "names": names
+    }
+    path = entry_store_path(json_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry_store_header(json_path), f, protocol=5)
+        pickle.dump(index, f, protocol=5)
+        f.write(body.getbuffer())
+    os.replace(tmp_path, path)
+
+class EntryStore:
+    """Accès direct aux nœuds partagés d'un catalogue, par identifiant ou par nom
+    
+    Seul l'index est lu à l'ouverture ; chaque nœud est ensuite lu à la demande
+    depuis sa position dans le magasin, puis gardé en mémoire.
+    """
+    
+    def __init__(self, f, index, data_start):
+        self.file = f
+        self.catalogue = index["catalogue"]  # Racine sans ses collections, hors catalogueLinks
+        self.entries = index["entries"]  # id -> (position, longueur, tag)
+        self.names = index["names"]  # nom -> [id]
+        self.data_start = data_start
+        self.nodes = {}
+    
+    @classmethod
+    def open(cls, json_path):
+        """Ouvre le magasin d'un dump JSON s'il correspond encore au JSON (None sinon)"""
+        try:
+            f = open(entry_store_path(json_path), 'rb')
+        except OSError:
+            return None
+        try:
+            if pickle.load(f) == entry_store_header(json_path):
+                return cls(f, pickle.load(f), f.tell())
+        except Exception:
+            pass
+        f.close()
+        return None
+    
+    def get(self, node_id):
+        """Nœud partagé d'identifiant donné (None s'il est inconnu)"""
+        node = self.nodes.get(node_id)
+        if node is None and node_id in self.entries:
+            offset, length, _ = self.entries[node_id]
+            self.file.seek(self.data_start + offset)
+            node = self.nodes[node_id] = pickle.loads(self.file.read(length))
+        return node
+    
+    def find(self, name_or_id, item_key="selectionEntry"):
+        """Identifiant du nœud de tag item_key désigné par son id ou son nom (None sinon)"""
+        location = self.entries.get(name_or_id)
+        if location and location[2] == item_key:
+            return name_or_id
+        for node_id in self.names.get(name_or_id, ()):
+            if self.entries[node_id][2] == item_key:
+                return node_id
+        return None
+    
+    def close(self):
+        self.file.close()
+
+def is_entry_store_fresh(json_path):
+    """Indique si le magasin par entrée d'un dump JSON est à jour (sans lire l'index)"""
+    try:
+        with open(entry_store_path(json_path), 'rb') as f:
+            return pickle.load(f) == entry_store_header(json_path)
+    except Exception:
+        return False
+
+@contextlib.contextmanager
+def gc_paused():
+    """Suspend le ramasse-miettes cyclique pendant la construction d'un gros arbre
+    
+    Les arbres convertis ne contiennent aucun cycle : les collectes déclenchées
+    par les millions d'allocations ne libèrent rien et coûtent d'autant plus cher
+    que des catalogues sont déjà chargés.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def load_json(file_path):
+    """Charge un dump JSON (compressé ou non), depuis son sidecar binaire lorsqu'il est à jour"""
+    with gc_paused():
+        data = load_sidecar(file_path)
+        if data is not None:
+            return data
+        with open_input(file_path) as f:
+            return json.load(f)
+
+def load_catalogue(file_path):
+    """Charge un catalogue complet depuis son dump JSON (ou son sidecar) ou depuis sa source XML"""
+    if is_xml_source(file_path):
+        return parse_cat_file(file_path)
+    return load_json(file_path)
+
+# Taille lue en tête d'un dump JSON pour en décoder les attributs de la racine
+ROOT_ATTRIBUTES_CHUNK = 64 * 1024
+
+def read_root_attributes(file_path):
+    """Attributs de la racine d'un catalogue (id, name, revision...), sans charger l'arbre
+    
+    Pour une source XML, seule la balise ouvrante est analysée. Dans un dump JSON,
+    les attributs précèdent les collections : ils sont décodés un à un en tête
+    de fichier jusqu'à la première valeur qui n'est pas une chaîne.
+    """
+    if is_xml_source(file_path):
+        with open_source(file_path) as f:
+            for _, element in ET.iterparse(f, events=('start',)):
+                return dict(element.attrib)
+        return {}
+    
+    with open_input(file_path) as f:
+        text = f.read(ROOT_ATTRIBUTES_CHUNK)
+    decoder = json.JSONDecoder()
+    skip = json.decoder.WHITESPACE.match
+    attributes = {}
+    try:
+        position = skip(text, text.index('{') + 1).end()
+        while text.startswith('"', position):
+            key, position = decoder.raw_decode(text, position)
+            position = skip(text, skip(text, position).end() + 1).end()  # ':'
+            if not text.startswith('"', position):
+                break
+            attributes[key], position = decoder.raw_decode(text, position)
+            position = skip(text, position).end()
+            if not text.startswith(',', position):
+                break
+            position = skip(text, position + 1).end()
+    except ValueError:
+        pass  # En-tête tronqué ou illisible : attributs lus jusque-là
+    return attributes
+
+def list_catalogues(directory):
+    """Dumps JSON et sources XML d'un répertoire, un seul fichier par catalogue (le JSON d'abord)"""
+    files = []
+    stems = set()
+    candidates = sorted(path for path in Path(directory).iterdir()
+                        if is_json_dump(path) and not path.name.startswith('.'))
+    candidates += list_sources(directory)
+    for file_path in candidates:
+        stem = dump_stem(file_path)
+        if stem not in stems:
+            stems.add(stem)
+            files.append(file_path)
+    return sorted(files, key=lambda path: path.name)
+
+def file_sha256(file_path):
+    """Calcule l'empreinte SHA-256 d'un fichier par blocs"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(output_dir):
+    """Charge le manifeste de conversion (vide s'il est absent ou illisible)"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest.get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(output_dir, entries):
+    """Écrit le manifeste de conversion de façon atomique"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    manifest = {
+        "converter_version": CONVERTER_VERSION,
+        "files": {name: entries[name] for name in sorted(entries)}
+    }
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+def conversion_options(normalize=False, output_format="pretty", compress=None, projection=DEFAULT_PROJECTION):
+    """Options de conversion qui changent la sortie (seules les valeurs non par défaut)"""
+    options = {}
+    if normalize:
+        options["normalize"] = True
+    if projection.options():
+        options["projection"] = projection.options()
+    if output_format != "pretty":
+        options["format"] = output_format
+    if compress:
+        options["compress"] = compress
+    return options
+
+def is_up_to_date(entry, digest, output_dir, options=None):
+    """Indique si une entrée du manifeste correspond encore à la source"""
+    return (
+        entry is not None
+        and entry.get("sha256") == digest
+        and entry.get("converter_version") == CONVERTER_VERSION
+        and entry.get("options", {}) == (options or {})
+        and (Path(output_dir) / entry.get("output", "")).is_file()
+    )
+
+def convert_file(file_path, output_dir, normalize=False, sidecar=True, output_format="pretty", compress=None,
+                 projection=DEFAULT_PROJECTION, backend=None):
+    """Convertit un fichier .cat/.gst (ou son archive zip) en JSON (et en sidecar binaire si sidecar)
+    
+    Retourne un dictionnaire {ok, messages, revision, timings}. Les messages
+    (niveau, texte) sont renvoyés plutôt qu'affichés pour que l'appelant puisse
+    les émettre dans un ordre déterministe, y compris depuis un pool de processus.
+    """
+    file_path = Path(file_path)
+    outcome = {
+        "ok": False,
+        "messages": [(reporting.VERBOSE, f"Traitement de {file_path.name}...")],
+        "revision": None,
+        "timings": {}
+    }
+    
+    # Lire et parser le fichier
+    start = time.perf_counter()
+    try:
+        result = parse_cat_file(file_path, normalize=normalize, projection=projection, backend=backend)
+    except Exception as e:
+        outcome["messages"].append((reporting.QUIET, f"  ✗ Échec du traitement de {file_path.name}: {e}"))
+        return outcome
+    outcome["timings"]["parse"] = time.perf_counter() - start
+    
+    # Créer le nom du fichier JSON de sortie
+    json_filename = file_path.stem + json_suffix(compress)
+    json_path = Path(output_dir) / json_filename
+    
+    # Écrire le résultat en JSON
+    start = time.perf_counter()
+    try:
+        with open_output(json_path, compress) as f:
+            dump_json(result, f, output_format)
+    except Exception as e:
+        outcome["messages"].append((reporting.QUIET, f"  ✗ Erreur lors de l'écriture de {json_filename}: {e}"))
+        return outcome
+    outcome["timings"]["write"] = time.perf_counter() - start
+    
+    if sidecar:
+        start = time.perf_counter()
+        try:
+            write_sidecar(json_path, result)
+            write_entry_store(json_path, result)
+        except Exception as e:
+            outcome["messages"].append((reporting.QUIET, f"  ⚠ Sidecar non écrit pour {json_filename}: {e}"))
+        outcome["timings"]["sidecar"] = time.perf_counter() - start
+    
+    outcome["messages"].append((reporting.VERBOSE, f"  ✓ Converti en {json_filename}"))
+    outcome["ok"] = True
+    outcome["revision"] = result.get("revision") if isinstance(result, dict) else None
+    return outcome
+
+def _convert_file_task(args):
+    """Point d'entrée des workers du pool (doit être picklable)"""
+    file_path, output_dir, options = args
+    try:
+        return convert_file(file_path, output_dir, **options)
+    except Exception as e:
+        return {
+            "ok": False,
+            "messages": [(reporting.QUIET, f"  ✗ Erreur inattendue sur {Path(file_path).name}: {e}")],
+            "revision": None,
+            "timings": {}
+        }
+
+def iter_conversions(tasks, jobs):
+    """Exécute les conversions (en pool si jobs > 1) et produit (indice, résultat) au fil de l'eau"""
+    if jobs > 1 and len(tasks) > 1:
+        # Les plus gros fichiers d'abord pour équilibrer la charge du pool
+        order = sorted(range(len(tasks)), key=lambda i: tasks[i][0].stat().st_size, reverse=True)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            yield from zip(order, executor.map(_convert_file_task, [tasks[i] for i in order]))
+    else:
+        for i, task in enumerate(tasks):
+            yield i, _convert_file_task(task)
+
+def check_backends(cat_dir, reporter):
+    """Vérifie que lxml et ElementTree produisent les mêmes arbres sur tous les catalogues
+    
+    Chaque fichier est converti avec les deux analyseurs, en flux et en lecture
+    complète, en mode brut et normalisé. Retourne le nombre de différences.
+    """
+    if lxml_etree is None:
+        reporter.error("✗ lxml n'est pas installé : rien à comparer")
+        return 1
+    
+    files = list_sources(cat_dir)
+    
+    mismatches = 0
+    for done, file_path in enumerate(files, 1):
+        for streaming in (True, False):
+            for normalize in (False, True):
+                with reporter.phase("etree"):
+                    expected = parse_cat_file(file_path, streaming, normalize, backend="etree")
+                with reporter.phase("lxml"):
+                    actual = parse_cat_file(file_path, streaming, normalize, backend="lxml")
+                if actual != expected:
+                    mismatches += 1
+                    reporter.error(f"  ✗ {file_path.name} (streaming={streaming}, normalize={normalize}) : "
+                                   f"arbres différents")
+        reporter.verbose(f"  ✓ {file_path.name}")
+        reporter.progress(done, len(files), "Comparaison")
+    
+    if mismatches:
+        reporter.error(f"✗ {mismatches} différences entre lxml et ElementTree")
+    else:
+        reporter.info(f"✓ lxml et ElementTree produisent des arbres identiques sur {len(files)} fichiers")
+    return mismatches
+
+def convert_all(args, reporter):
+    """Convertit les fichiers de ./cat modifiés depuis la dernière exécution"""
     cat_dir = Path("./cat")
     output_dir = Path("./SourceIntoJsonFormat")
     
     # Vérifier que le répertoire source existe
     if not cat_dir.exists():
-        print("Le répertoire 'cat' n'existe pas")
+        reporter.error("Le répertoire 'cat' n'existe pas")
         return
     
     # Créer le répertoire de destination s'il n'existe pas
     output_dir.mkdir(exist_ok=True)
-    print(f"Fichiers JSON seront créés dans : {output_dir}")
+    reporter.info(f"Fichiers JSON seront créés dans : {output_dir}")
+    reporter.info(f"Analyseur XML : {reporter.context['backend']}")
     
-    # Parcourir tous les fichiers .cat et .gst
-    for extension in ["*.cat", "*.gst"]:
-        for file_path in cat_dir.glob(extension):
-            print(f"Traitement de {file_path.name}...")
-            
-            # Lire et parser le fichier
-            result = read_cat_file(file_path)
-            
-            if result is not None:
-                # Créer le nom du fichier JSON de sortie
-                json_filename = file_path.stem + '.json'
-                json_path = output_dir / json_filename
-                
-                # Écrire le résultat en JSON
+    # Parcourir tous les fichiers .cat/.gst et leurs archives .catz/.gstz/.rosz
+    # (ordre trié pour un résumé déterministe)
+    files = []
+    stems = {}
+    for file_path in list_sources(cat_dir):
+        # Un catalogue présent en clair et zippé produirait deux fois le même JSON
+        if file_path.stem in stems:
+            reporter.error(f"  ⚠ {file_path.name} ignoré : même nom que {stems[file_path.stem]}")
+            continue
+        stems[file_path.stem] = file_path.name
+        files.append(file_path)
+    
+    # Comparer les empreintes au manifeste pour ne reconvertir que ce qui a changé
+    with reporter.phase("manifest"):
+        manifest = load_manifest(output_dir)
+        projection = projection_from_args(args)
+        options = conversion_options(args.normalize, args.output_format, args.compress, projection)
+        new_manifest = {}
+        digests = {}
+        pending = []
+        refresh = []
+        for file_path in files:
+            digest = file_sha256(file_path)
+            entry = manifest.get(file_path.name)
+            if not args.force and is_up_to_date(entry, digest, output_dir, options):
+                new_manifest[file_path.name] = entry
+                if not args.no_sidecar:
+                    refresh.append(output_dir / entry["output"])
+            else:
+                digests[file_path.name] = digest
+                pending.append(file_path)
+    
+    # Sorties inchangées dont le sidecar ou le magasin par entrée manque ou est
+    # périmé : régénérés depuis le JSON
+    with reporter.phase("sidecar"):
+        for json_path in refresh:
+            if not is_sidecar_fresh(json_path) or not is_entry_store_fresh(json_path):
                 try:
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, indent=2, ensure_ascii=False)
-                    print(f"  ✓ Converti en {json_filename}")
+                    with open_input(json_path) as f:
+                        data = json.load(f)
+                    write_sidecar(json_path, data)
+                    write_entry_store(json_path, data)
+                    reporter.count("sidecars_refreshed")
                 except Exception as e:
-                    print(f"  ✗ Erreur lors de l'écriture de {json_filename}: {e}")
-            else:
-                print(f"  ✗ Échec du traitement de {file_path.name}")
+                    reporter.error(f"  ⚠ Sidecar non écrit pour {json_path.name}: {e}")
+    
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    task_options = {
+        "normalize": args.normalize,
+        "sidecar": not args.no_sidecar,
+        "output_format": args.output_format,
+        "compress": args.compress,
+        "projection": projection,
+        "backend": reporter.context["backend"]
+    }
+    tasks = [(file_path, output_dir, task_options) for file_path in pending]
+    
+    # Les résultats arrivent dans l'ordre d'exécution ; ils sont émis triés ensuite
+    results = [None] * len(tasks)
+    for done, (i, outcome) in enumerate(iter_conversions(tasks, jobs), 1):
+        results[i] = outcome
+        reporter.progress(done, len(tasks), "Conversion")
+    
+    failures = []
+    for file_path, outcome in zip(pending, results):
+        for level, message in outcome["messages"]:
+            reporter.log(level, message)
+        for phase, seconds in outcome["timings"].items():
+            reporter.add_phase(phase, seconds)
+        if outcome["ok"]:
+            output_name = file_path.stem + json_suffix(args.compress)
+            # Sortie précédente sous un autre nom (changement de compression)
+            previous = manifest.get(file_path.name, {}).get("output")
+            if previous and previous != output_name:
+                (output_dir / previous).unlink(missing_ok=True)
+            new_manifest[file_path.name] = {
+                "output": output_name,
+                "sha256": digests[file_path.name],
+                "revision": outcome["revision"],
+                "converter_version": CONVERTER_VERSION
+            }
+            if options:
+                new_manifest[file_path.name]["options"] = options
+            reporter.count("converted")
+            reporter.count("bytes_in", file_path.stat().st_size)
+        else:
+            failures.append(file_path.name)
+            reporter.count("failed")
+            # La sortie précédente reste sur disque : son entrée est conservée pour
+            # qu'elle reste suivie, sans empreinte pour forcer une nouvelle conversion
+            if file_path.name in manifest:
+                new_manifest[file_path.name] = {**manifest[file_path.name], "sha256": None}
+    reporter.count("unchanged", len(files) - len(pending))
+    
+    # Supprimer les sorties dont la source a disparu, une fois les conversions
+    # faites : une sortie reprise par une source courante (X.cat remplaçant
+    # X.catz, ou l'inverse) est conservée
+    source_names = {file_path.name for file_path in files}
+    produced = {entry["output"] for entry in new_manifest.values()}
+    for name, entry in manifest.items():
+        if name in source_names:
+            continue
+        output = entry.get("output")
+        if output in produced:
+            reporter.verbose(f"  ~ {output} repris par une autre source que {name}")
+            continue
+        output_path = output_dir / (output or "")
+        if output and output_path.is_file():
+            output_path.unlink()
+            sidecar_path(output_path).unlink(missing_ok=True)
+            entry_store_path(output_path).unlink(missing_ok=True)
+        reporter.info(f"  - Supprimé {output} (source {name} absente)")
+        reporter.count("removed")
+    
+    save_manifest(output_dir, new_manifest)
+    
+    reporter.info(f"\n{len(pending) - len(failures)}/{len(pending)} fichiers convertis, "
+                  f"{len(files) - len(pending)} inchangés")
+    if failures:
+        reporter.error("✗ Échecs : " + ", ".join(failures))
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description='Convertit les fichiers BattleScribe .cat/.gst (et .catz/.gstz/.rosz) en JSON brut')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Nombre de processus de conversion (0 = nombre de CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reconvertit tous les fichiers sans consulter le manifeste')
+    parser.add_argument('--normalize', action='store_true',
+                        help='Émet toujours les collections connues (profiles/profile, costs/cost...) sous forme de liste')
+    parser.add_argument('--no-sidecar', action='store_true',
+                        help=f"N'écrit pas le sidecar binaire ({SIDECAR_SUFFIX}) ni le magasin par entrée "
+                             f"({ENTRY_STORE_SUFFIX}) à côté de chaque JSON")
+    add_output_arguments(parser)
+    add_projection_arguments(parser)
+    add_backend_argument(parser)
+    parser.add_argument('--check-backends', action='store_true',
+                        help='Compare les arbres produits par lxml et ElementTree sur tous les fichiers de ./cat')
+    reporting.add_arguments(parser)
+    
+    args = parser.parse_args()
+    reporter = reporting.from_args(args, "convert_xml")
+    try:
+        reporter.context["backend"] = set_backend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.check_backends:
+        sys.exit(1 if check_backends("./cat", reporter) else 0)
+    
+    with reporting.session(args, reporter):
+        convert_all(args, reporter)
+    
+    if args.metrics_json:
+        reporter.write_metrics(args.metrics_json)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Différences entre deux versions d'un catalogue BattleScribe
+Les nœuds sont appariés par identifiant (tables de hachage, temps linéaire) et
+les entrées, liens, profils, règles et coûts ajoutés, supprimés ou modifiés sont
+listés ; le rapport JSON alimente les changelogs et la retransformation incrémentale
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Set, Iterable
+
+import convert_xml
+import reporting
+
+# Tags suivis individuellement et leur catégorie dans le rapport
+TRACKED_TAGS = {
+    "selectionEntry": "entries",
+    "selectionEntryGroup": "entries",
+    "entryLink": "links",
+    "profile": "profiles",
+    "rule": "rules",
+    "cost": "costs",
+}
+
+# Libellés des catégories dans le changelog
+KIND_LABELS = {
+    "entries": "entrée",
+    "links": "lien",
+    "profiles": "profil",
+    "rules": "règle",
+    "costs": "coût",
+}
+
+class CatalogueIndex:
+    """Nœuds suivis d'un catalogue, indexés par (catégorie, clé)
+    
+    Le contenu propre de chaque nœud est une copie où les nœuds suivis
+    descendants sont remplacés par une référence : une modification n'est
+    signalée que sur le nœud qui la porte. Les coûts, sans identifiant, ont pour
+    clé l'identifiant de leur propriétaire et leur typeId. Un index inverse des
+    liens (entryLink, infoLink) associe à chaque cible les nœuds qui y renvoient.
+    """
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.nodes: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (catégorie, clé) -> nœud indexé
+        self.owners: Dict[str, Optional[str]] = {}  # id de nœud -> id de son propriétaire
+        self.linkers: Dict[str, Set[str]] = {}  # targetId -> ids des nœuds qui y renvoient
+        self.duplicates = 0
+        self.snapshot(None, data, None)
+    
+    def snapshot(self, tag: Optional[str], value: Any, owner_id: Optional[str]) -> Any:
+        """Copie canonique d'une valeur, en indexant les nœuds suivis rencontrés
+        
+        Une liste d'un seul élément vaut cet élément, ce qui rend comparables les
+        arbres bruts et normalisés (--normalize).
+        """
+        if isinstance(value, list):
+            items = [self.snapshot(tag, item, owner_id) for item in value]
+            return items[0] if len(items) == 1 else items
+        if not isinstance(value, dict):
+            return value
+        
+        kind = TRACKED_TAGS.get(tag)
+        target_id = value.get("targetId")
+        if target_id:
+            # Un entryLink suivi est son propre nœud, un infoLink appartient à son propriétaire
+            linker = value.get("id") if kind and value.get("id") else owner_id
+            if linker:
+                self.linkers.setdefault(target_id, set()).add(linker)
+        if kind == "costs":
+            key = f"{owner_id}:{value.get('typeId')}"
+            return self.register(kind, key, tag, value, owner_id, {"typeId": value.get("typeId")})
+        if kind and value.get("id"):
+            return self.register(kind, value["id"], tag, value, owner_id, {"id": value["id"]})
+        return {key: self.snapshot(key, child, owner_id) for key, child in value.items()}
+    
+    def register(self, kind: str, key: str, tag: str, node: Dict[str, Any], owner_id: Optional[str],
+                 reference: Dict[str, Any]) -> Dict[str, Any]:
+        """Indexe un nœud suivi et retourne la référence qui le remplace chez son parent"""
+        node_id = node.get("id")
+        own = {name: self.snapshot(name, child, node_id or owner_id) for name, child in node.items()}
+        if (kind, key) in self.nodes:
+            # Première définition conservée, comme dans CatalogueRegistry
+            self.duplicates += 1
+            return reference
+        self.nodes[(kind, key)] = {"tag": tag, "name": node.get("name"), "owner": owner_id, "own": own}
+        if node_id:
+            self.owners[node_id] = owner_id
+        return reference
+    
+    def root_entry(self, node_id: Optional[str]) -> Optional[str]:
+        """Nœud de plus haut niveau (entrée racine ou partagée) contenant un nœud"""
+        seen = set()
+        while node_id in self.owners and self.owners[node_id] is not None and node_id not in seen:
+            seen.add(node_id)
+            node_id = self.owners[node_id]
+        return node_id
+    
+    def dependents(self, node_ids: Iterable[str]) -> Set[str]:
+        """Entrées racines qui contiennent l'un des nœuds donnés ou y mènent par des liens
+        
+        Chaque nœud remonte sa chaîne de propriétaires ; à chaque étape, les nœuds
+        qui renvoient vers l'identifiant rencontré sont traités à leur tour.
+        """
+        roots = set()
+        pending = list(node_ids)
+        seen = set()
+        while pending:
+            node_id = pending.pop()
+            while node_id is not None and node_id not in seen:
+                seen.add(node_id)
+                pending.extend(self.linkers.get(node_id, ()))
+                owner_id = self.owners.get(node_id)
+                if owner_id is None:
+                    roots.add(node_id)
+                node_id = owner_id
+        return roots
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Champs modifiés d'un nœud : valeurs avant/après pour les attributs, nom seul sinon"""
+    fields = []
+    for name in sorted(set(old) | set(new)):
+        before, after = old.get(name), new.get(name)
+        if before == after:
+            continue
+        if isinstance(before, (dict, list)) or isinstance(after, (dict, list)):
+            fields.append({"field": name})
+        else:
+            fields.append({"field": name, "old": before, "new": after})
+    return fields
+
+def characteristic_values(own: Dict[str, Any]) -> Dict[str, str]:
+    """Valeurs des caractéristiques d'un profil, par nom"""
+    values = {}
+    for characteristic in convert_xml.get_collection(own, "characteristics", "characteristic"):
+        if isinstance(characteristic, dict) and "name" in characteristic:
+            values[characteristic["name"]] = characteristic.get("_text", "")
+    return values
+
+def profile_changes(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Détail d'un profil modifié : caractéristiques changées, puis autres champs"""
+    old_values = characteristic_values(old)
+    new_values = characteristic_values(new)
+    fields = [
+        {"field": name, "old": old_values.get(name), "new": new_values.get(name)}
+        for name in list(old_values) + [name for name in new_values if name not in old_values]
+        if old_values.get(name) != new_values.get(name)
+    ]
+    others = {name: value for name, value in old.items() if name != "characteristics"}
+    fields.extend(changed_fields(others, {name: value for name, value in new.items() if name != "characteristics"}))
+    return fields
+
+def describe(key: str, node: Dict[str, Any], index: CatalogueIndex) -> Dict[str, Any]:
+    """Élément du rapport pour un nœud ajouté ou supprimé"""
+    item = {"key": key, "tag": node["tag"], "name": node["name"], "root": index.root_entry(node["owner"] or key)}
+    if node["tag"] == "cost":
+        item["name"] = node["own"].get("name")
+        item["value"] = node["own"].get("value")
+        item["root"] = index.root_entry(node["owner"])
+    return item
+
+def diff_catalogues(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare deux arbres de catalogue et retourne le rapport de différences"""
+    old_index = CatalogueIndex(old_data)
+    new_index = CatalogueIndex(new_data)
+    
+    changes = {kind: {"added": [], "removed": [], "modified": []} for kind in KIND_LABELS}
+    touched = set()  # Identifiants des nœuds ajoutés, modifiés ou supprimés
+    
+    for (kind, key), node in new_index.nodes.items():
+        previous = old_index.nodes.get((kind, key))
+        if previous is None:
+            item = describe(key, node, new_index)
+            changes[kind]["added"].append(item)
+        elif previous["own"] != node["own"]:
+            compare = profile_changes if kind == "profiles" else changed_fields
+            item = describe(key, node, new_index)
+            item["changes"] = compare(previous["own"], node["own"])
+            changes[kind]["modified"].append(item)
+        else:
+            continue
+        touched.add(node["owner"] if kind == "costs" else key)
+    
+    for (kind, key), node in old_index.nodes.items():
+        if (kind, key) not in new_index.nodes:
+            item = describe(key, node, old_index)
+            changes[kind]["removed"].append(item)
+            # Les liens vers un nœud supprimé sont suivis dans la nouvelle version ;
+            # une entrée racine supprimée n'est plus à retransformer (filtrée plus bas)
+            touched.add(node["owner"] if kind == "costs" else key)
+            touched.add(item["root"])
+    
+    for kind_changes in changes.values():
+        for items in kind_changes.values():
+            items.sort(key=lambda item: (item["name"] or "", item["key"]))
+    
+    # Attributs du catalogue lui-même (nom, révision, auteur...)
+    catalogue_fields = changed_fields(
+        {name: value for name, value in old_data.items() if not isinstance(value, (dict, list))},
+        {name: value for name, value in new_data.items() if not isinstance(value, (dict, list))}
+    )
+    
+    touched.discard(None)
+    affected = new_index.dependents(touched)
+    return {
+        "old": {"id": old_data.get("id"), "name": old_data.get("name"), "revision": old_data.get("revision")},
+        "new": {"id": new_data.get("id"), "name": new_data.get("name"), "revision": new_data.get("revision")},
+        "catalogue": catalogue_fields,
+        "changes": changes,
+        # Entrées racines à retransformer (ajoutées, contenant un nœud modifié ou y menant par un lien)
+        "affected_entries": sorted(key for key in affected if key in new_index.owners),
+        "duplicates": old_index.duplicates + new_index.duplicates
+    }
+
+def has_changes(report: Dict[str, Any]) -> bool:
+    """Indique si un rapport contient au moins une différence"""
+    return bool(report["catalogue"]) or any(
+        items for kind_changes in report["changes"].values() for items in kind_changes.values()
+    )
+
+def revision_number(revision: Any) -> int:
+    """Révision BattleScribe sous forme d'entier (0 si absente)"""
+    try:
+        return int(revision)
+    except (TypeError, ValueError):
+        return 0
+
+def format_change(item: Dict[str, Any]) -> str:
+    """Détail lisible des champs modifiés d'un nœud"""
+    parts = []
+    for field in item.get("changes", []):
+        if "old" in field or "new" in field:
+            parts.append(f"{field['field']} {field.get('old')} → {field.get('new')}")
+        else:
+            parts.append(field["field"])
+    return ", ".join(parts)
+
+def report_changelog(report: Dict[str, Any], reporter: reporting.Reporter):
+    """Affiche le rapport sous forme de changelog"""
+    old, new = report["old"], report["new"]
+    reporter.info(f"{new['name'] or old['name']} : révision {old['revision']} → {new['revision']}")
+    if has_changes(report) and old["revision"] == new["revision"]:
+        reporter.error("  ⚠ Contenu modifié sans changement de révision")
+    elif revision_number(new["revision"]) < revision_number(old["revision"]):
+        reporter.error("  ⚠ La nouvelle révision est antérieure à l'ancienne")
+    
+    for field in report["catalogue"]:
+        reporter.info(f"  ~ catalogue : {format_change({'changes': [field]})}")
+    
+    for kind, label in KIND_LABELS.items():
+        kind_changes = report["changes"][kind]
+        counts = {status: len(items) for status, items in kind_changes.items()}
+        if not any(counts.values()):
+            continue
+        reporter.info(f"  {kind} : +{counts['added']} -{counts['removed']} ~{counts['modified']}")
+        for status, sign in (("added", "+"), ("removed", "-"), ("modified", "~")):
+            for item in kind_changes[status]:
+                detail = f" : {format_change(item)}" if status == "modified" else ""
+                if kind == "costs" and status != "modified":
+                    detail = f" = {item.get('value')}"
+                reporter.verbose(f"    {sign} {label} {item['name']} ({item['key']}){detail}")
+    
+    if report["duplicates"]:
+        reporter.verbose(f"  ⚠ {report['duplicates']} identifiants en double ignorés")
+    reporter.info(f"  {len(report['affected_entries'])} entrées à retransformer")
+
+def pair_files(old_dir: Path, new_dir: Path) -> List[Tuple[Optional[Path], Optional[Path]]]:
+    """Apparie les catalogues de deux répertoires par nom de fichier (sans extension)"""
+    old_files = {convert_xml.dump_stem(path): path for path in convert_xml.list_catalogues(old_dir)}
+    new_files = {convert_xml.dump_stem(path): path for path in convert_xml.list_catalogues(new_dir)}
+    return [(old_files.get(stem), new_files.get(stem)) for stem in sorted(set(old_files) | set(new_files))]
+
+def diff_paths(old_path: Path, new_path: Path, reporter: reporting.Reporter) -> Dict[str, Any]:
+    """Compare deux fichiers, ou deux répertoires de catalogues appariés par nom"""
+    if old_path.is_dir() and new_path.is_dir():
+        pairs = pair_files(old_path, new_path)
+    else:
+        pairs = [(old_path, new_path)]
+    
+    reports = {}
+    for done, (old_file, new_file) in enumerate(pairs, 1):
+        stem = convert_xml.dump_stem(old_file or new_file)
+        if old_file is None:
+            reporter.info(f"+ Catalogue ajouté : {new_file.name}")
+            reports[stem] = {"status": "added"}
+        elif new_file is None:
+            reporter.info(f"- Catalogue supprimé : {old_file.name}")
+            reports[stem] = {"status": "removed"}
+        else:
+            with reporter.phase("load"):
+                old_data = convert_xml.load_catalogue(old_file)
+                new_data = convert_xml.load_catalogue(new_file)
+            with reporter.phase("diff"):
+                report = diff_catalogues(old_data, new_data)
+            if has_changes(report):
+                report["status"] = "modified"
+                report_changelog(report, reporter)
+                reporter.count("modified")
+            else:
+                report = {"status": "unchanged"}
+                reporter.verbose(f"= {stem} inchangé")
+                reporter.count("unchanged")
+            reports[stem] = report
+        reporter.progress(done, len(pairs), "Comparaison")
+    return reports
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description='Compare deux versions de catalogues BattleScribe (appariement par id)')
+    parser.add_argument('old', type=str, help='Ancienne version : catalogue (.cat/.gst/.catz ou JSON) ou répertoire')
+    parser.add_argument('new', type=str, help='Nouvelle version : catalogue ou répertoire')
+    parser.add_argument('--json', type=str, default=None, help='Écrit le rapport de différences dans ce fichier JSON')
+    reporting.add_arguments(parser)
+    
+    args = parser.parse_args()
+    reporter = reporting.from_args(args, "diff_catalogues")
+    
+    old_path, new_path = Path(args.old), Path(args.new)
+    if old_path.is_dir() != new_path.is_dir():
+        parser.error("les deux versions doivent être deux fichiers ou deux répertoires")
+    
+    try:
+        with reporting.session(args, reporter):
+            reports = diff_paths(old_path, new_path, reporter)
+    except Exception as e:
+        reporter.error(f"✗ Erreur lors de la comparaison : {e}")
+        sys.exit(2)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        reporter.info(f"✓ Rapport écrit dans {args.json}")
+    
+    if args.metrics_json:
+        reporter.write_metrics(args.metrics_json)
+    
+    # Comme diff : 0 sans différence, 1 sinon
+    sys.exit(1 if any(report["status"] != "unchanged" for report in reports.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Export des catalogues BattleScribe convertis vers une base SQLite normalisée
+Une table par type de nœud (entrées, profils, caractéristiques, liens, coûts,
+catégories), indexée sur id, targetId, typeId et name : les recherches ponctuelles
+deviennent des requêtes indexées au lieu de parcours complets des dumps JSON
+"""
+
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import convert_xml
+import reporting
+
+# Version du schéma : l'incrémenter recrée la base au prochain export
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE catalogues (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    revision INTEGER,
+    game_system_id TEXT,
+    library INTEGER,
+    file TEXT UNIQUE,
+    sha256 TEXT
+);
+CREATE TABLE selection_entries (
+    id TEXT,
+    catalogue_id TEXT,
+    parent_id TEXT,
+    kind TEXT,
+    name TEXT,
+    type TEXT,
+    shared INTEGER,
+    hidden INTEGER
+);
+CREATE TABLE profiles (
+    id TEXT,
+    catalogue_id TEXT,
+    owner_id TEXT,
+    name TEXT,
+    type_id TEXT,
+    type_name TEXT,
+    hidden INTEGER
+);
+CREATE TABLE characteristics (
+    profile_id TEXT,
+    catalogue_id TEXT,
+    name TEXT,
+    type_id TEXT,
+    value TEXT
+);
+CREATE TABLE links (
+    id TEXT,
+    catalogue_id TEXT,
+    owner_id TEXT,
+    kind TEXT,
+    name TEXT,
+    type TEXT,
+    target_id TEXT,
+    is_primary INTEGER
+);
+CREATE TABLE costs (
+    owner_id TEXT,
+    catalogue_id TEXT,
+    name TEXT,
+    type_id TEXT,
+    value REAL
+);
+CREATE TABLE categories (
+    id TEXT,
+    catalogue_id TEXT,
+    name TEXT,
+    hidden INTEGER
+);
+CREATE INDEX selection_entries_id ON selection_entries (id);
+CREATE INDEX selection_entries_name ON selection_entries (name);
+CREATE INDEX selection_entries_parent ON selection_entries (parent_id);
+CREATE INDEX selection_entries_catalogue ON selection_entries (catalogue_id);
+CREATE INDEX profiles_id ON profiles (id);
+CREATE INDEX profiles_name ON profiles (name);
+CREATE INDEX profiles_type_id ON profiles (type_id);
+CREATE INDEX profiles_owner ON profiles (owner_id);
+CREATE INDEX profiles_catalogue ON profiles (catalogue_id);
+CREATE INDEX characteristics_profile ON characteristics (profile_id);
+CREATE INDEX characteristics_type_id ON characteristics (type_id);
+CREATE INDEX characteristics_catalogue ON characteristics (catalogue_id);
+CREATE INDEX links_id ON links (id);
+CREATE INDEX links_target_id ON links (target_id);
+CREATE INDEX links_owner ON links (owner_id);
+CREATE INDEX links_name ON links (name);
+CREATE INDEX links_catalogue ON links (catalogue_id);
+CREATE INDEX costs_owner ON costs (owner_id);
+CREATE INDEX costs_type_id ON costs (type_id);
+CREATE INDEX costs_catalogue ON costs (catalogue_id);
+CREATE INDEX categories_id ON categories (id);
+CREATE INDEX categories_name ON categories (name);
+CREATE INDEX categories_catalogue ON categories (catalogue_id);
+"""
+
+# Tables alimentées par catalogue, avec le nombre de colonnes de leurs lignes
+ROW_TABLES = {
+    "selection_entries": 8,
+    "profiles": 7,
+    "characteristics": 5,
+    "links": 8,
+    "costs": 5,
+    "categories": 4,
+}
+
+LINK_TAGS = ("entryLink", "infoLink", "categoryLink", "catalogueLink")
+
+# Entrées portant (directement, par entryLink ou par sous-entrée) un profil donné
+CARRIERS_QUERY = """
+WITH RECURSIVE carriers(id) AS (
+    SELECT owner_id FROM profiles WHERE name = :name AND owner_id IS NOT NULL
+    UNION
+    SELECT links.owner_id FROM links JOIN carriers ON links.target_id = carriers.id
+        WHERE links.kind = 'entryLink' AND links.owner_id IS NOT NULL
+    UNION
+    SELECT links.owner_id FROM links JOIN carriers ON links.id = carriers.id
+        WHERE links.owner_id IS NOT NULL
+    UNION
+    SELECT selection_entries.parent_id FROM selection_entries JOIN carriers ON selection_entries.id = carriers.id
+        WHERE selection_entries.parent_id IS NOT NULL
+)
+SELECT DISTINCT catalogues.name, selection_entries.id, selection_entries.name, selection_entries.type
+FROM selection_entries
+JOIN carriers ON selection_entries.id = carriers.id
+JOIN catalogues ON catalogues.id = selection_entries.catalogue_id
+WHERE selection_entries.type IN ('unit', 'model')
+ORDER BY catalogues.name, selection_entries.name
+"""
+
+# Liens ciblant un identifiant, avec le nom de l'entrée (ou du lien) qui les contient
+LINKS_TO_QUERY = """
+SELECT catalogues.name, links.kind, links.id, links.name, links.owner_id, COALESCE(
+    (SELECT name FROM selection_entries WHERE selection_entries.id = links.owner_id LIMIT 1),
+    (SELECT name FROM links AS owners WHERE owners.id = links.owner_id LIMIT 1)
+)
+FROM links
+JOIN catalogues ON catalogues.id = links.catalogue_id
+WHERE links.target_id = :target_id
+ORDER BY catalogues.name, links.kind, links.name
+"""
+
+def flag(node: Dict[str, Any], name: str) -> int:
+    """Attribut booléen BattleScribe ("true"/"false") converti en 0/1"""
+    return 1 if node.get(name) == "true" else 0
+
+def to_number(value: Any, cast=float) -> Optional[Any]:
+    """Convertit un attribut numérique (None s'il est absent ou invalide)"""
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+def extract_rows(data: Dict[str, Any], catalogue_id: str) -> Dict[str, List[Tuple]]:
+    """Lignes de chaque table pour un arbre de catalogue (brut ou normalisé)
+    
+    L'arbre est parcouru avec une pile explicite. Le propriétaire d'un nœud est
+    le plus proche ancêtre portant un identifiant (None à la racine du catalogue).
+    """
+    rows = {table: [] for table in ROW_TABLES}
+    # Pile de (tag, nœud, id du propriétaire, tag du conteneur)
+    stack = [(None, data, None, None)]
+    
+    while stack:
+        tag, node, owner_id, container = stack.pop()
+        node_id = node.get("id")
+        
+        if tag in ("selectionEntry", "selectionEntryGroup"):
+            shared = 1 if container and container.startswith("shared") else 0
+            rows["selection_entries"].append((node_id, catalogue_id, owner_id, tag, node.get("name"),
+                                              node.get("type"), shared, flag(node, "hidden")))
+        elif tag == "profile":
+            rows["profiles"].append((node_id, catalogue_id, owner_id, node.get("name"), node.get("typeId"),
+                                     node.get("typeName"), flag(node, "hidden")))
+        elif tag == "characteristic":
+            rows["characteristics"].append((owner_id, catalogue_id, node.get("name"), node.get("typeId"),
+                                            node.get("_text", "")))
+        elif tag in LINK_TAGS:
+            rows["links"].append((node_id, catalogue_id, owner_id, tag, node.get("name"), node.get("type"),
+                                  node.get("targetId"), flag(node, "primary")))
+        elif tag == "cost":
+            rows["costs"].append((owner_id, catalogue_id, node.get("name"), node.get("typeId"),
+                                  to_number(node.get("value"))))
+        elif tag == "categoryEntry":
+            rows["categories"].append((node_id, catalogue_id, node.get("name"), flag(node, "hidden")))
+        
+        # La racine (le catalogue) n'est pas un propriétaire : ses enfants directs ont owner_id None
+        child_owner = node_id if tag is not None and node_id else owner_id
+        children = []
+        for key, value in node.items():
+            # Conteneur (ex. selectionEntries) : ses éléments gardent le même propriétaire
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                if isinstance(item, dict):
+                    children.append((key, item, child_owner, tag))
+        # Ordre du document conservé à l'insertion
+        stack.extend(reversed(children))
+    
+    return rows
+
+def open_database(db_path: str) -> sqlite3.Connection:
+    """Ouvre la base et (re)crée le schéma s'il est absent ou d'une autre version"""
+    connection = sqlite3.connect(db_path)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            connection.execute(f'DROP TABLE "{table}"')
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+    return connection
+
+def delete_catalogue(connection: sqlite3.Connection, catalogue_id: str):
+    """Supprime toutes les lignes d'un catalogue"""
+    for table in ROW_TABLES:
+        connection.execute(f"DELETE FROM {table} WHERE catalogue_id = ?", (catalogue_id,))
+    connection.execute("DELETE FROM catalogues WHERE id = ?", (catalogue_id,))
+
+def export_catalogue(connection: sqlite3.Connection, file_path: Path, digest: str, reporter: reporting.Reporter):
+    """Remplace les lignes d'un catalogue par celles de son arbre, en une transaction"""
+    with reporter.phase("load"):
+        data = convert_xml.load_catalogue(file_path)
+    catalogue_id = data.get("id") if isinstance(data, dict) else None
+    if not catalogue_id:
+        raise ValueError("catalogue sans identifiant")
+    
+    with reporter.phase("extract"):
+        rows = extract_rows(data, catalogue_id)
+    
+    with reporter.phase("insert"):
+        with connection:
+            # Ancienne version du même fichier ou même catalogue sous un autre nom
+            previous = connection.execute("SELECT id FROM catalogues WHERE file = ?", (file_path.name,)).fetchone()
+            if previous:
+                delete_catalogue(connection, previous[0])
+            delete_catalogue(connection, catalogue_id)
+            
+            connection.execute("INSERT INTO catalogues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                catalogue_id, data.get("name"), data.get("type"), to_number(data.get("revision"), int),
+                data.get("gameSystemId"), flag(data, "library"), file_path.name, digest
+            ))
+            for table, table_rows in rows.items():
+                placeholders = ", ".join("?" * ROW_TABLES[table])
+                connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", table_rows)
+                reporter.count(table, len(table_rows))
+    return rows
+
+def export_all(args, reporter: reporting.Reporter):
+    """Exporte les catalogues modifiés depuis le dernier export"""
+    input_dir = Path(args.input)
+    if not input_dir.is_dir():
+        reporter.error(f"✗ Répertoire introuvable : {input_dir}")
+        return
+    
+    files = convert_xml.list_catalogues(input_dir)
+    connection = open_database(args.output)
+    reporter.info(f"Export de {len(files)} catalogues vers {args.output}")
+    
+    known = dict(connection.execute("SELECT file, sha256 FROM catalogues").fetchall())
+    exported = 0
+    failures = []
+    for done, file_path in enumerate(files, 1):
+        digest = convert_xml.file_sha256(file_path)
+        if not args.force and known.get(file_path.name) == digest:
+            reporter.count("unchanged")
+        else:
+            try:
+                rows = export_catalogue(connection, file_path, digest, reporter)
+                exported += 1
+                reporter.verbose(f"  ✓ {file_path.name} ({len(rows['selection_entries'])} entrées, "
+                                 f"{len(rows['profiles'])} profils, {len(rows['links'])} liens)")
+            except Exception as e:
+                reporter.error(f"  ✗ Échec de l'export de {file_path.name}: {e}")
+                failures.append(file_path.name)
+        reporter.progress(done, len(files), "Export")
+    
+    # Catalogues dont le fichier a disparu
+    names = {file_path.name for file_path in files}
+    with connection:
+        for catalogue_id, file_name in connection.execute("SELECT id, file FROM catalogues").fetchall():
+            if file_name not in names:
+                delete_catalogue(connection, catalogue_id)
+                reporter.info(f"  - Supprimé {file_name} (fichier absent)")
+                reporter.count("removed")
+    connection.close()
+    
+    reporter.count("exported", exported)
+    reporter.info(f"\n{exported}/{exported + len(failures)} catalogues exportés, "
+                  f"{len(files) - exported - len(failures)} inchangés")
+    if failures:
+        reporter.error("✗ Échecs : " + ", ".join(failures))
+
+def find_carriers(connection: sqlite3.Connection, profile_name: str) -> List[Tuple]:
+    """Unités et figurines portant un profil (arme, aptitude...) : (catalogue, id, nom, type)"""
+    return connection.execute(CARRIERS_QUERY, {"name": profile_name}).fetchall()
+
+def find_links_to(connection: sqlite3.Connection, target_id: str) -> List[Tuple]:
+    """Liens ciblant un identifiant : (catalogue, type de lien, id, nom, id et nom du propriétaire)"""
+    return connection.execute(LINKS_TO_QUERY, {"target_id": target_id}).fetchall()
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description='Exporte les catalogues BattleScribe convertis vers SQLite')
+    parser.add_argument('--input', type=str, default="SourceIntoJsonFormat",
+                        help='Répertoire des dumps JSON (ou des sources .cat/.gst/.catz)')
+    parser.add_argument('--output', type=str, default="battlescribe.sqlite", help='Base SQLite produite')
+    parser.add_argument('--force', action='store_true', help='Réexporte tous les catalogues, même inchangés')
+    parser.add_argument('--carriers', type=str, default=None, metavar='PROFIL',
+                        help="Liste les unités portant ce profil (sans export)")
+    parser.add_argument('--links-to', type=str, default=None, metavar='ID',
+                        help="Liste les liens ciblant cet identifiant (sans export)")
+    reporting.add_arguments(parser)
+    
+    args = parser.parse_args()
+    reporter = reporting.from_args(args, "export_sqlite")
+    
+    # Requêtes sur une base existante
+    if args.carriers or args.links_to:
+        if not Path(args.output).is_file():
+            reporter.error(f"✗ Base introuvable : {args.output}")
+            return
+        connection = sqlite3.connect(args.output)
+        if args.carriers:
+            for catalogue, entry_id, name, entry_type in find_carriers(connection, args.carriers):
+                reporter.info(f"{catalogue} : {name} ({entry_type}, {entry_id})")
+        if args.links_to:
+            for catalogue, kind, link_id, name, owner_id, owner_name in find_links_to(connection, args.links_to):
+                reporter.info(f"{catalogue} : {kind} {name} ({link_id}) dans {owner_name or owner_id or 'la racine'}")
+        connection.close()
+        return
+    
+    with reporting.session(args, reporter):
+        export_all(args, reporter)
+    
+    if args.metrics_json:
+        reporter.write_metrics(args.metrics_json)
+
+if __name__ == "__main__":
+    main()
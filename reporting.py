@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Canal d'événements commun à convert_xml.py et transform_battlescribe.py
+Messages à niveaux (silencieux par défaut pour le détail par entrée), barre de
+progression limitée en fréquence et métriques par phase exportables en JSON
+"""
+
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import contextlib
+import tracemalloc
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+# Niveaux de messages
+QUIET = 0    # Erreurs uniquement
+INFO = 1     # Résumés (par défaut)
+VERBOSE = 2  # Détail par fichier / par entrée
+
+class Reporter:
+    """Canal de messages, de progression et de métriques"""
+    
+    def __init__(self, level: int = INFO, show_progress: Optional[bool] = None, min_interval: float = 0.1):
+        self.level = level
+        # Par défaut, la progression n'est affichée que sur un terminal
+        if show_progress is None:
+            show_progress = level > QUIET and sys.stderr.isatty()
+        self.show_progress = show_progress
+        self.min_interval = min_interval
+        self.phases: Dict[str, Dict[str, float]] = {}  # nom -> {"count", "seconds"}
+        self.counters: Dict[str, int] = {}
+        self.context: Dict[str, Any] = {}  # Informations libres (outil, options...)
+        self.profile = False  # Chronométrage détaillé (--profile)
+        self.events: Optional[List[Tuple[int, str]]] = None  # Messages enregistrés (voir record)
+        self.started = time.perf_counter()
+        self._last_progress = 0.0
+        self._progress_open = False
+    
+    def log(self, level: int, message: str):
+        """Affiche (ou enregistre) un message si le niveau courant le permet"""
+        if level <= self.level:
+            if self.events is not None:
+                self.events.append((level, message))
+                return
+            self.end_progress()
+            print(message)
+    
+    def record(self) -> List[Tuple[int, str]]:
+        """Enregistre désormais les messages (niveau, texte) au lieu de les afficher
+        
+        Utilisé par les workers : le processus parent réémet les événements
+        retournés, chacun à son niveau.
+        """
+        self.events = []
+        return self.events
+    
+    def error(self, message: str):
+        """Affiche un message d'erreur (toujours visible)"""
+        self.log(QUIET, message)
+    
+    def info(self, message: str):
+        self.log(INFO, message)
+    
+    def verbose(self, message: str):
+        self.log(VERBOSE, message)
+    
+    def count(self, name: str, n: int = 1):
+        """Incrémente un compteur de métriques"""
+        self.counters[name] = self.counters.get(name, 0) + n
+    
+    def add_phase(self, name: str, seconds: float, count: int = 1):
+        """Ajoute une durée mesurée à une phase"""
+        phase = self.phases.setdefault(name, {"count": 0, "seconds": 0.0})
+        phase["count"] += count
+        phase["seconds"] += seconds
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Chronomètre un bloc et l'ajoute aux métriques de la phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+    
+    def detail(self, name: str):
+        """Comme phase, mais seulement en mode --profile (aucun coût sinon)"""
+        return self.phase(name) if self.profile else contextlib.nullcontext()
+    
+    def instrument(self, obj: Any, method_names: Iterable[str]):
+        """Chronomètre les méthodes données d'un objet (durées inclusives, par nom)
+        
+        Les méthodes sont remplacées au niveau de l'instance, ce qui couvre aussi
+        les appels dynamiques (getattr). À n'utiliser qu'en mode --profile.
+        """
+        for name in method_names:
+            method = getattr(obj, name)
+            
+            @functools.wraps(method)
+            def timed(*args, _method=method, _name=name, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    self.add_phase(_name, time.perf_counter() - start)
+            
+            setattr(obj, name, timed)
+    
+    def format_phases(self) -> str:
+        """Tableau des phases : nombre d'appels, durée totale et moyenne"""
+        lines = [f"{'Phase':<28} {'Appels':>8} {'Total (s)':>10} {'Moyenne (ms)':>13}"]
+        for name, phase in sorted(self.phases.items(), key=lambda item: item[1]["seconds"], reverse=True):
+            mean = phase["seconds"] / phase["count"] * 1000 if phase["count"] else 0.0
+            lines.append(f"{name:<28} {phase['count']:>8} {phase['seconds']:>10.3f} {mean:>13.3f}")
+        lines.append(f"{'total':<28} {'':>8} {time.perf_counter() - self.started:>10.3f}")
+        return "\n".join(lines)
+    
+    def progress(self, done: int, total: int, label: str = ""):
+        """Met à jour la barre de progression (au plus une fois par min_interval)"""
+        if not self.show_progress or total <= 0:
+            return
+        now = time.perf_counter()
+        if done < total and now - self._last_progress < self.min_interval:
+            return
+        self._last_progress = now
+        
+        width = 30
+        filled = int(width * done / total)
+        sys.stderr.write(f"\r{label} [{'#' * filled}{'.' * (width - filled)}] {done}/{total}")
+        sys.stderr.flush()
+        self._progress_open = True
+        if done >= total:
+            self.end_progress()
+    
+    def end_progress(self):
+        """Termine la ligne de progression en cours"""
+        if self._progress_open:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+            self._progress_open = False
+    
+    def merge(self, metrics: Dict[str, Any]):
+        """Intègre les métriques produites par un autre processus (worker)"""
+        for name, phase in metrics.get("phases", {}).items():
+            self.add_phase(name, phase["seconds"], phase["count"])
+        for name, value in metrics.get("counters", {}).items():
+            self.count(name, value)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Retourne les métriques collectées"""
+        return {
+            **self.context,
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {
+                name: {"count": phase["count"], "seconds": round(phase["seconds"], 6)}
+                for name, phase in self.phases.items()
+            },
+            "counters": dict(self.counters)
+        }
+    
+    def write_metrics(self, file_path: str):
+        """Écrit les métriques dans un fichier JSON"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metrics(), f, indent=2, ensure_ascii=False)
+
+_reporter = Reporter()
+
+@contextlib.contextmanager
+def profile_session(reporter: Reporter, report_path: Optional[str] = None, top: int = 30):
+    """Active le mode --profile le temps d'un bloc et affiche le tableau des phases
+    
+    Avec report_path, le bloc est aussi exécuté sous cProfile et tracemalloc, et
+    le rapport (phases, fonctions les plus coûteuses, plus grosses allocations)
+    est écrit dans ce fichier. Seul le processus courant est mesuré.
+    """
+    reporter.profile = True
+    profiler = None
+    if report_path:
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        
+        phases = reporter.format_phases()
+        reporter.log(QUIET, "\n" + phases)
+        
+        if profiler:
+            stats_output = io.StringIO()
+            pstats.Stats(profiler, stream=stats_output).sort_stats("cumulative").print_stats(top)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write("=== Phases ===\n")
+                f.write(phases + "\n\n")
+                f.write(f"=== cProfile (top {top}, temps cumulé) ===\n")
+                f.write(stats_output.getvalue() + "\n")
+                f.write(f"=== tracemalloc (top {top}) ===\n")
+                f.write(f"Mémoire actuelle : {current / 1024 / 1024:.1f} Mo, pic : {peak / 1024 / 1024:.1f} Mo\n")
+                for stat in snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
+            reporter.info(f"✓ Rapport de profilage écrit dans {report_path}")
+
+def get_reporter() -> Reporter:
+    """Retourne le canal courant du processus"""
+    return _reporter
+
+def set_reporter(reporter: Reporter) -> Reporter:
+    """Remplace le canal courant du processus"""
+    global _reporter
+    _reporter = reporter
+    return reporter
+
+def add_arguments(parser):
+    """Ajoute les options communes de verbosité et de métriques à un parseur argparse"""
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', '-q', action='store_true', help="N'affiche que les erreurs")
+    verbosity.add_argument('--verbose', '-v', action='store_true', help='Affiche le détail par fichier / par entrée')
+    parser.add_argument('--no-progress', action='store_true', help='Désactive la barre de progression')
+    parser.add_argument('--metrics-json', type=str, default=None,
+                        help='Écrit les comptes et durées par phase dans ce fichier JSON')
+    parser.add_argument('--profile', action='store_true',
+                        help='Chronomètre chaque phase et extracteur et affiche le tableau des durées')
+    parser.add_argument('--profile-report', type=str, default=None,
+                        help='Avec --profile : exécute aussi cProfile et tracemalloc et écrit le rapport dans ce fichier')
+
+def from_args(args, tool: str) -> Reporter:
+    """Configure le canal courant depuis les options de add_arguments"""
+    level = QUIET if args.quiet else VERBOSE if args.verbose else INFO
+    reporter = Reporter(level, show_progress=False if args.no_progress else None)
+    reporter.context["tool"] = tool
+    return set_reporter(reporter)
+
+def session(args, reporter: Reporter):
+    """Bloc de profilage si --profile (ou --profile-report) est demandé"""
+    if args.profile or args.profile_report:
+        return profile_session(reporter, args.profile_report)
+    return contextlib.nullcontext()
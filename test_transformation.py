@@ -4,15 +4,18 @@ Script de test pour valider la transformation des données BattleScribe
 Compare le fichier transformé avec le fichier de référence
 """
 
+import sys
 import json
 import argparse
 from pathlib import Path
 from typing import Dict, List, Any
 
+import convert_xml
+
 def load_json_file(file_path: str) -> Dict[str, Any]:
-    """Charge un fichier JSON"""
+    """Charge un fichier JSON (indenté ou compact, compressé en gzip/xz ou non)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with convert_xml.open_input(file_path) as f:
             return json.load(f)
     except Exception as e:
         print(f"Erreur lors du chargement de {file_path}: {e}")
@@ -99,14 +102,49 @@ def validate_data_quality(transformed: Dict[str, Any]) -> List[str]:
     
     return issues
 
+def check_unique_ids(output_dir: str) -> List[str]:
+    """Vérifie que les id de datasheets et d'enhancements sont uniques sur tous les fichiers d'un répertoire"""
+    issues = []
+    seen = {}  # id -> (fichier, nom)
+    for file_path in sorted(Path(output_dir).iterdir()):
+        if not convert_xml.is_json_dump(file_path) or file_path.name.startswith('.'):
+            continue
+        data = load_json_file(str(file_path))
+        for key in ("datasheets", "enhancements"):
+            for item in data.get(key, []):
+                item_id = item.get("id")
+                if item_id in seen:
+                    other_file, other_name = seen[item_id]
+                    issues.append(f"{item_id} : {file_path.name} ({item.get('name')}) "
+                                  f"et {other_file} ({other_name})")
+                else:
+                    seen[item_id] = (file_path.name, item.get("name"))
+    print(f"{len(seen)} identifiants vérifiés")
+    return issues
+
 def main():
     """Fonction principale"""
     parser = argparse.ArgumentParser(description='Teste la transformation des données BattleScribe')
-    parser.add_argument('--transformed', type=str, required=True, help='Chemin vers le fichier transformé')
-    parser.add_argument('--reference', type=str, required=True, help='Chemin vers le fichier de référence')
+    parser.add_argument('--transformed', type=str, help='Chemin vers le fichier transformé')
+    parser.add_argument('--reference', type=str, help='Chemin vers le fichier de référence')
+    parser.add_argument('--check-ids', type=str, default=None, metavar='REPERTOIRE',
+                        help="Vérifie l'unicité des id sur toutes les sorties d'un répertoire (mode --all)")
     
     args = parser.parse_args()
     
+    if args.check_ids:
+        issues = check_unique_ids(args.check_ids)
+        if issues:
+            print(f"✗ {len(issues)} identifiants en double :")
+            for issue in issues:
+                print(f"  - {issue}")
+            sys.exit(1)
+        print("✓ Identifiants uniques")
+        return
+    
+    if not args.transformed or not args.reference:
+        parser.error("--transformed et --reference sont requis (sauf avec --check-ids)")
+    
     # Vérification des fichiers
     if not Path(args.transformed).exists():
         print(f"✗ Le fichier transformé {args.transformed} n'existe pas")
@@ -4,54 +4,352 @@ Script de transformation des données BattleScribe vers le format JSON simplifi
 Transforme les fichiers .cat/.gst en format compatible avec les fichiers de validation
 """
 
+import sys
 import json
+import hashlib
+import glob
 import argparse
+import contextlib
+import multiprocessing
+import os
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+
+import convert_xml
+import reporting
+from catalogue_registry import CatalogueRegistry, StoreRegistry, load_catalogue_file
+
+GAME_SYSTEM_NAME = "Warhammer 40,000"
+
+# Configuration des types de profil (par nom, tel que déclaré dans profileTypes du
+# système de jeu) : paquet de destination, méthode visiteuse et champ de sortie de
+# chaque caractéristique. Un nouveau type de profil ne demande qu'une entrée ici.
+WEAPON_FIELDS = {
+    "Range": "range",
+    "A": "attacks",
+    "BS": "skill",
+    "S": "strength",
+    "AP": "ap",
+    "D": "damage",
+    "Keywords": "keywords"
+}
+PROFILE_TYPE_CONFIG = {
+    "Abilities": {"bucket": "abilities", "visitor": "visit_ability_profile",
+                  "fields": {"Description": "description"}},
+    "Unit": {"bucket": "stats", "visitor": "visit_unit_profile",
+             "fields": {"M": "m", "T": "t", "SV": "sv", "W": "w", "LD": "ld", "OC": "oc"}},
+    "Ranged Weapons": {"bucket": "rangedWeapons", "visitor": "visit_weapon_profile", "fields": WEAPON_FIELDS},
+    "Melee Weapons": {"bucket": "meleeWeapons", "visitor": "visit_weapon_profile", "fields": WEAPON_FIELDS},
+}
+# typeIds utilisés si le système de jeu n'a pas pu être chargé
+DEFAULT_PROFILE_TYPE_IDS = {
+    "9cc3-6d83-4dd3-9b64": "Abilities",
+    "c547-1836-d8a-ff4f": "Unit",
+    "f77d-b953-8fa4-b762": "Ranged Weapons",
+    "8a40-4aaa-c780-9046": "Melee Weapons",
+}
+PROFILE_BUCKETS = ("abilities", "stats", "rangedWeapons", "meleeWeapons")
+ENTRY_BUCKETS = ("abilities", "stats")  # Lus sur les profils de l'entrée
+WARGEAR_BUCKETS = ("rangedWeapons", "meleeWeapons")  # Lus sur les entrées d'équipement
+
+# Version des extracteurs : l'incrémenter invalide le cache par entrée
+TRANSFORMER_VERSION = "3"
+
+# Méthodes chronométrées individuellement en mode --profile (durées inclusives)
+PROFILED_METHODS = (
+    "extract_datasheet", "extract_enhancements", "visit_entry", "add_linked_abilities",
+    "visit_ability_profile", "visit_unit_profile", "visit_weapon_profile",
+    "extract_keywords", "extract_points", "make_id"
+)
+
+# Espace de noms des identifiants UUIDv5 : un même couple (faction, entrée
+# BattleScribe) produit toujours le même identifiant d'une exécution à l'autre
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://game-datacards.eu")
+
+# Mapping des noms de fichiers vers les IDs de faction
+FACTION_MAPPING = {
+    "Imperium - Dark Angels": {"id": "CHDA", "name": "Dark Angels"},
+    "Imperium - Blood Angels": {"id": "CHBA", "name": "Blood Angels"},
+    "Imperium - Space Wolves": {"id": "CHSW", "name": "Space Wolves"},
+    "Imperium - Ultramarines": {"id": "SM", "name": "Ultramarines"},
+    "Imperium - Imperial Fists": {"id": "CHIF", "name": "Imperial Fists"},
+    "Imperium - Iron Hands": {"id": "CHIH", "name": "Iron Hands"},
+    "Imperium - Raven Guard": {"id": "CHRG", "name": "Raven Guard"},
+    "Imperium - Salamanders": {"id": "CHS", "name": "Salamanders"},
+    "Imperium - White Scars": {"id": "CHWS", "name": "White Scars"},
+    "Imperium - Black Templars": {"id": "CHBT", "name": "Black Templars"},
+    "Imperium - Deathwatch": {"id": "CHDW", "name": "Deathwatch"},
+    "Imperium - Grey Knights": {"id": "GK", "name": "Grey Knights"},
+    "Imperium - Adeptus Custodes": {"id": "AC", "name": "Adeptus Custodes"},
+    "Imperium - Adepta Sororitas": {"id": "AS", "name": "Adepta Sororitas"},
+    "Imperium - Adeptus Mechanicus": {"id": "AdM", "name": "Adeptus Mechanicus"},
+    "Imperium - Astra Militarum": {"id": "AM", "name": "Astra Militarum"},
+    "Imperium - Imperial Knights": {"id": "QI", "name": "Imperial Knights"},
+    "Imperium - Agents of the Imperium": {"id": "AoI", "name": "Agents of the Imperium"},
+    "Imperium - Space Marines": {"id": "SM", "name": "Space Marines"},
+    "Chaos - Chaos Space Marines": {"id": "CSM", "name": "Chaos Space Marines"},
+    "Chaos - Death Guard": {"id": "DG", "name": "Death Guard"},
+    "Chaos - Thousand Sons": {"id": "TS", "name": "Thousand Sons"},
+    "Chaos - World Eaters": {"id": "WE", "name": "World Eaters"},
+    "Chaos - Emperor's Children": {"id": "LGEC", "name": "Emperor's Children"},
+    "Chaos - Chaos Daemons": {"id": "CD", "name": "Chaos Daemons"},
+    "Chaos - Chaos Knights": {"id": "QT", "name": "Chaos Knights"},
+    "Aeldari - Craftworlds": {"id": "AE", "name": "Aeldari"},
+    "Aeldari - Drukhari": {"id": "DRU", "name": "Drukhari"},
+    "Aeldari - Ynnari": {"id": "AE", "name": "Aeldari"},
+    "Necrons": {"id": "NEC", "name": "Necrons"},
+    "Orks": {"id": "ORK", "name": "Orks"},
+    "T'au Empire": {"id": "TAU", "name": "T'au Empire"},
+    "Tyranids": {"id": "TYR", "name": "Tyranids"},
+    "Leagues of Votann": {"id": "LoV", "name": "Leagues of Votann"},
+    "Genestealer Cults": {"id": "GSC", "name": "Genestealer Cults"}
+}
+
+class ProfileTypeTable:
+    """Table compilée une fois : typeId de profil -> visiteur, typeId de caractéristique -> champ"""
+    
+    def __init__(self):
+        self.visitors: Dict[str, Tuple[str, str]] = {}  # typeId de profil -> (paquet, méthode)
+        self.fields: Dict[str, str] = {}  # typeId de caractéristique -> champ de sortie
+        self.fields_by_name: Dict[str, Dict[str, str]] = {}  # typeId de profil -> nom -> champ
+    
+    @classmethod
+    def compile(cls, game_system_data: Optional[Dict[str, Any]] = None) -> "ProfileTypeTable":
+        """Construit la table depuis les profileTypes/characteristicTypes du système de jeu"""
+        table = cls()
+        for type_id, type_name in DEFAULT_PROFILE_TYPE_IDS.items():
+            table.add_profile_type(type_id, type_name, [])
+        
+        for profile_type in convert_xml.get_collection(game_system_data, "profileTypes", "profileType"):
+            characteristic_types = convert_xml.get_collection(profile_type, "characteristicTypes", "characteristicType")
+            table.add_profile_type(profile_type.get("id"), profile_type.get("name"), characteristic_types)
+        return table
+    
+    def add_profile_type(self, type_id: str, type_name: str, characteristic_types: List[Dict[str, Any]]):
+        """Enregistre un type de profil s'il est décrit dans PROFILE_TYPE_CONFIG"""
+        config = PROFILE_TYPE_CONFIG.get(type_name)
+        if not config or not type_id:
+            return
+        self.visitors[type_id] = (config["bucket"], config["visitor"])
+        self.fields_by_name[type_id] = config["fields"]
+        for characteristic_type in characteristic_types:
+            field = config["fields"].get(characteristic_type.get("name"))
+            if field and characteristic_type.get("id"):
+                self.fields[characteristic_type["id"]] = field
+    
+    def bucket(self, profile: Dict[str, Any]) -> Optional[str]:
+        """Retourne le paquet de destination d'un profil (None si le type est ignoré)"""
+        visitor = self.visitors.get(profile.get("typeId"))
+        return visitor[0] if visitor else None
+    
+    def field(self, profile_type_id: str, characteristic: Dict[str, Any]) -> Optional[str]:
+        """Retourne le champ de sortie d'une caractéristique (par typeId, puis par nom)"""
+        field = self.fields.get(characteristic.get("typeId"))
+        if field is None:
+            field = self.fields_by_name.get(profile_type_id, {}).get(characteristic.get("name"))
+        return field
+
+class EntryCache:
+    """Cache disque des datasheets/enhancements extraits, indexé par empreinte d'entrée
+    
+    Chaque faction a son fichier de cache. Une entrée est réutilisée si l'empreinte
+    de son sous-arbre selectionEntry est inchangée, si les nœuds du registre que
+    son extraction a résolus (armes liées, profils et règles des infoLinks) ont
+    toujours la même empreinte, et si le contexte (version du transformateur,
+    règles partagées, types de profil) est identique ; sinon elle est recalculée.
+    """
+    
+    def __init__(self, cache_file: str, context: str):
+        self.cache_file = Path(cache_file)
+        self.context = context
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.used: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == TRANSFORMER_VERSION and data.get("context") == context:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+    
+    @staticmethod
+    def entry_key(selection_entry: Dict[str, Any]) -> str:
+        """Empreinte SHA-256 du sous-arbre d'une selectionEntry"""
+        payload = json.dumps(selection_entry, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str, node_hash) -> Optional[Dict[str, Any]]:
+        """Retourne le résultat mis en cache pour une empreinte (None si absent ou périmé)
+        
+        node_hash donne l'empreinte actuelle d'un nœud du registre par identifiant.
+        """
+        cached = self.entries.get(key)
+        if cached is None or any(node_hash(node_id) != digest
+                                 for node_id, digest in cached.get("dependencies", {}).items()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used[key] = cached
+        return cached
+    
+    def put(self, key: str, datasheet: Optional[Dict[str, Any]], enhancement: Optional[Dict[str, Any]],
+            dependencies: Dict[str, Optional[str]]):
+        """Enregistre le résultat d'extraction d'une entrée et l'empreinte des nœuds résolus"""
+        self.used[key] = {"datasheet": datasheet, "enhancement": enhancement, "dependencies": dependencies}
+    
+    def save(self):
+        """Écrit le cache (seules les entrées vues lors de cette exécution sont conservées)"""
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": TRANSFORMER_VERSION, "context": self.context, "entries": self.used},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, self.cache_file)
+
+class StreamingJsonWriter:
+    """Écrit un objet JSON champ par champ, au même format que json.dump(indent=2)
+    
+    Les listes peuvent être ouvertes puis alimentées élément par élément, ce qui
+    permet d'écrire un document sans l'avoir entièrement construit en mémoire.
+    Avec compact=True, la sortie est celle de json.dump(separators=(",", ":")).
+    """
+    
+    def __init__(self, f, compact: bool = False):
+        self.f = f
+        self.compact = compact
+        self.newline = "" if compact else "\n"
+        self.indent = "" if compact else "  "
+        self.first_field = True
+        self.first_item = True
+        self.f.write("{")
+    
+    def dumps(self, value: Any, prefix: str) -> str:
+        """Sérialise une valeur en décalant ses lignes du préfixe d'indentation"""
+        if self.compact:
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + prefix)
+    
+    def write_key(self, key: str):
+        separator = "" if self.first_field else ","
+        self.f.write(separator + self.newline + self.indent + json.dumps(key, ensure_ascii=False)
+                     + (":" if self.compact else ": "))
+        self.first_field = False
+    
+    def write_field(self, key: str, value: Any):
+        """Écrit un champ complet de l'objet racine"""
+        self.write_key(key)
+        self.f.write(self.dumps(value, "  "))
+    
+    def begin_list(self, key: str):
+        """Ouvre un champ liste alimenté ensuite par write_item"""
+        self.write_key(key)
+        self.f.write("[")
+        self.first_item = True
+    
+    def write_item(self, value: Any):
+        separator = "" if self.first_item else ","
+        self.f.write(separator + self.newline + self.indent * 2 + self.dumps(value, "    "))
+        self.first_item = False
+    
+    def end_list(self):
+        self.f.write("]" if self.first_item else self.newline + self.indent + "]")
+    
+    def close(self):
+        self.f.write("}" if self.first_field else self.newline + "}")
 
 class BattleScribeTransformer:
     """Classe pour transformer les données BattleScribe vers le format JSON simplifié"""
     
-    def __init__(self, source_file: str, output_file: str):
+    def __init__(self, source_file: str, output_file: str,
+                 source_data: Optional[Dict[str, Any]] = None,
+                 game_system_file: Optional[str] = None,
+                 registry: Optional[CatalogueRegistry] = None,
+                 cache_dir: Optional[str] = None,
+                 reporter: Optional[reporting.Reporter] = None,
+                 output_format: str = "pretty",
+                 compress: Optional[str] = None):
         self.source_file = source_file
         self.output_file = output_file
-        self.source_data = None
+        self.source_data = source_data  # Arbre déjà converti en mémoire (optionnel)
+        self.game_system_file = game_system_file
+        self.registry = registry  # Index global pour suivre les liens (optionnel)
+        self.cache_dir = cache_dir  # Répertoire du cache par entrée (optionnel)
+        self.output_format = output_format  # "pretty" (indent=2) ou "compact"
+        self.compress = compress  # None, "gzip" ou "xz"
         self.game_system_data = None
         self.shared_rules = set()  # Ensemble des règles partagées
+        self.profile_types = ProfileTypeTable.compile()  # Recompilée depuis le système de jeu
+        self.reporter = reporter or reporting.get_reporter()
+        self.node_hashes: Dict[str, Optional[str]] = {}  # Empreintes des nœuds du registre
+        if self.reporter.profile:
+            self.reporter.instrument(self, PROFILED_METHODS)
     
     def find_key_with_prefix(self, data: Dict[str, Any], key_name: str) -> Optional[str]:
         """Trouve une clé (maintenant sans préfixe de namespace)"""
         return key_name if key_name in data else None
-        
+    
+    def get_collection(self, data: Dict[str, Any], container_key: str, item_key: str) -> List[Any]:
+        """Retourne les éléments d'une collection (ex. profiles/profile) sous forme de liste"""
+        return convert_xml.get_collection(data, container_key, item_key)
+    
     def load_json_file(self, file_path: str) -> Dict[str, Any]:
-        """Charge un fichier JSON"""
+        """Charge un fichier JSON (depuis son sidecar binaire s'il est à jour)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return convert_xml.load_json(file_path)
         except Exception as e:
-            print(f"Erreur lors du chargement de {file_path}: {e}")
+            self.reporter.error(f"Erreur lors du chargement de {file_path}: {e}")
             return {}
     
+    def load_catalogue(self, file_path: str) -> Dict[str, Any]:
+        """Charge un catalogue, depuis le .cat/.gst zippé ou non (en flux) ou depuis son dump JSON"""
+        if convert_xml.is_xml_source(file_path):
+            projection = convert_xml.PROJECTION_PRESETS["transformer"]
+            return convert_xml.read_cat_file(file_path, normalize=True, projection=projection) or {}
+        return self.load_json_file(file_path)
+    
+    def load_source(self) -> Dict[str, Any]:
+        """Retourne l'arbre source, en le chargeant s'il n'a pas été fourni"""
+        if not self.source_data:
+            self.source_data = self.load_catalogue(self.source_file)
+        return self.source_data
+    
+    def resolve_game_system_file(self) -> str:
+        """Détermine le fichier du système de jeu à côté de la source"""
+        if self.game_system_file:
+            return self.game_system_file
+        
+        source_dir = Path(self.source_file).parent
+        # Source XML : le .gst (ou .gstz) est dans le même répertoire
+        if convert_xml.is_xml_source(self.source_file):
+            zipped = source_dir / f"{GAME_SYSTEM_NAME}.gstz"
+            plain = source_dir / f"{GAME_SYSTEM_NAME}.gst"
+            return str(zipped if zipped.exists() and not plain.exists() else plain)
+        
+        for suffix in convert_xml.JSON_SUFFIXES:
+            json_file = source_dir / f"{GAME_SYSTEM_NAME}{suffix}"
+            if json_file.exists():
+                return str(json_file)
+        return f"SourceIntoJsonFormat/{GAME_SYSTEM_NAME}.json"
+    
     def load_shared_rules(self):
-        """Charge les règles partagées depuis Warhammer 40,000.json"""
-        game_system_file = "SourceIntoJsonFormat/Warhammer 40,000.json"
+        """Charge les règles partagées depuis le système de jeu (Warhammer 40,000)"""
+        game_system_file = self.resolve_game_system_file()
         try:
-            game_system_data = self.load_json_file(game_system_file)
-            if "sharedRules" in game_system_data:
-                shared_rules = game_system_data["sharedRules"]
-                if "rule" in shared_rules:
-                    rules = shared_rules["rule"]
-                    if isinstance(rules, list):
-                        for rule in rules:
-                            if "name" in rule:
-                                self.shared_rules.add(rule["name"])
-                    else:
-                        if "name" in rules:
-                            self.shared_rules.add(rules["name"])
-            print(f"✓ Chargé {len(self.shared_rules)} règles partagées")
+            with self.reporter.phase("load_shared_rules"):
+                game_system_data = self.load_catalogue(game_system_file)
+                for rule in self.get_collection(game_system_data, "sharedRules", "rule"):
+                    if "name" in rule:
+                        self.shared_rules.add(rule["name"])
+                self.profile_types = ProfileTypeTable.compile(game_system_data)
+            self.reporter.info(f"✓ Chargé {len(self.shared_rules)} règles partagées")
         except Exception as e:
-            print(f"⚠ Erreur lors du chargement des règles partagées: {e}")
+            self.reporter.error(f"⚠ Erreur lors du chargement des règles partagées: {e}")
             # Règles partagées par défaut si le fichier n'est pas trouvé
             self.shared_rules = {
                 "Leader", "Pistol", "Hazardous", "Devastating Wounds", "Assault", 
@@ -66,61 +364,33 @@ class BattleScribeTransformer:
     def save_json_file(self, data: Dict[str, Any], file_path: str):
         """Sauvegarde un fichier JSON"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            print(f"✓ Fichier sauvegardé: {file_path}")
+            with self.reporter.phase("save"), convert_xml.open_output(file_path, self.compress) as f:
+                convert_xml.dump_json(data, f, self.output_format)
+            self.reporter.info(f"✓ Fichier sauvegardé: {file_path}")
         except Exception as e:
-            print(f"✗ Erreur lors de la sauvegarde de {file_path}: {e}")
+            self.reporter.error(f"✗ Erreur lors de la sauvegarde de {file_path}: {e}")
+    
+    def make_id(self, kind: str, selection_entry: Dict[str, Any]) -> str:
+        """Génère un identifiant stable (UUIDv5) à partir du catalogue source et de l'id BattleScribe
+        
+        La clé est le nom du fichier source (sans extension), propre à chaque
+        fichier produit : l'identifiant de faction est partagé par plusieurs
+        catalogues (SM pour Space Marines et Ultramarines, UNKNOWN par défaut).
+        """
+        source_key = convert_xml.dump_stem(self.source_file)
+        entry_key = selection_entry.get("id") or selection_entry.get("name", "")
+        return str(uuid.uuid5(ID_NAMESPACE, f"{source_key}:{kind}:{entry_key}"))
     
     def extract_faction_info(self) -> Dict[str, Any]:
         """Extrait les informations de faction depuis le fichier source"""
         
         # Déterminer l'ID et le nom de faction basé sur le nom du fichier source
-        source_name = Path(self.source_file).stem
-        
-        # Mapping des noms de fichiers vers les IDs de faction
-        faction_mapping = {
-            "Imperium - Dark Angels": {"id": "CHDA", "name": "Dark Angels"},
-            "Imperium - Blood Angels": {"id": "CHBA", "name": "Blood Angels"},
-            "Imperium - Space Wolves": {"id": "CHSW", "name": "Space Wolves"},
-            "Imperium - Ultramarines": {"id": "SM", "name": "Ultramarines"},
-            "Imperium - Imperial Fists": {"id": "CHIF", "name": "Imperial Fists"},
-            "Imperium - Iron Hands": {"id": "CHIH", "name": "Iron Hands"},
-            "Imperium - Raven Guard": {"id": "CHRG", "name": "Raven Guard"},
-            "Imperium - Salamanders": {"id": "CHS", "name": "Salamanders"},
-            "Imperium - White Scars": {"id": "CHWS", "name": "White Scars"},
-            "Imperium - Black Templars": {"id": "CHBT", "name": "Black Templars"},
-            "Imperium - Deathwatch": {"id": "CHDW", "name": "Deathwatch"},
-            "Imperium - Grey Knights": {"id": "GK", "name": "Grey Knights"},
-            "Imperium - Adeptus Custodes": {"id": "AC", "name": "Adeptus Custodes"},
-            "Imperium - Adepta Sororitas": {"id": "AS", "name": "Adepta Sororitas"},
-            "Imperium - Adeptus Mechanicus": {"id": "AdM", "name": "Adeptus Mechanicus"},
-            "Imperium - Astra Militarum": {"id": "AM", "name": "Astra Militarum"},
-            "Imperium - Imperial Knights": {"id": "QI", "name": "Imperial Knights"},
-            "Imperium - Agents of the Imperium": {"id": "AoI", "name": "Agents of the Imperium"},
-            "Imperium - Space Marines": {"id": "SM", "name": "Space Marines"},
-            "Chaos - Chaos Space Marines": {"id": "CSM", "name": "Chaos Space Marines"},
-            "Chaos - Death Guard": {"id": "DG", "name": "Death Guard"},
-            "Chaos - Thousand Sons": {"id": "TS", "name": "Thousand Sons"},
-            "Chaos - World Eaters": {"id": "WE", "name": "World Eaters"},
-            "Chaos - Emperor's Children": {"id": "LGEC", "name": "Emperor's Children"},
-            "Chaos - Chaos Daemons": {"id": "CD", "name": "Chaos Daemons"},
-            "Chaos - Chaos Knights": {"id": "QT", "name": "Chaos Knights"},
-            "Aeldari - Craftworlds": {"id": "AE", "name": "Aeldari"},
-            "Aeldari - Drukhari": {"id": "DRU", "name": "Drukhari"},
-            "Aeldari - Ynnari": {"id": "AE", "name": "Aeldari"},
-            "Necrons": {"id": "NEC", "name": "Necrons"},
-            "Orks": {"id": "ORK", "name": "Orks"},
-            "T'au Empire": {"id": "TAU", "name": "T'au Empire"},
-            "Tyranids": {"id": "TYR", "name": "Tyranids"},
-            "Leagues of Votann": {"id": "LoV", "name": "Leagues of Votann"},
-            "Genestealer Cults": {"id": "GSC", "name": "Genestealer Cults"}
-        }
+        source_name = convert_xml.dump_stem(self.source_file)
         
         # Déterminer les informations de faction
-        if source_name in faction_mapping:
-            faction_id = faction_mapping[source_name]["id"]
-            faction_name = faction_mapping[source_name]["name"]
+        if source_name in FACTION_MAPPING:
+            faction_id = FACTION_MAPPING[source_name]["id"]
+            faction_name = FACTION_MAPPING[source_name]["name"]
         else:
             # Fallback pour les factions non reconnues
             faction_id = "UNKNOWN"
@@ -224,36 +494,23 @@ class BattleScribeTransformer:
         
         # Extraction des factions alliées depuis catalogueLinks
         allied_factions = []
-        if "catalogueLinks" in self.source_data:
-            catalogue_links = self.source_data["catalogueLinks"]
-            if "catalogueLink" in catalogue_links:
-                links = catalogue_links["catalogueLink"]
-                if isinstance(links, list):
-                    for link in links:
-                        link_name = link.get("name", "")
-                        # Mapper les noms BattleScribe vers les IDs de faction
-                        if "Imperial Knights" in link_name:
-                            allied_factions.append("QI")
-                        elif "Agents of the Imperium" in link_name:
-                            allied_factions.append("AoI")
-                        elif "Space Marines" in link_name and faction_name not in link_name:
-                            allied_factions.append("SM")
-                else:
-                    link_name = links.get("name", "")
-                    if "Imperial Knights" in link_name:
-                        allied_factions.append("QI")
-                    elif "Agents of the Imperium" in link_name:
-                        allied_factions.append("AoI")
-                    elif "Space Marines" in link_name and faction_name not in link_name:
-                        allied_factions.append("SM")
+        for link in self.get_collection(self.source_data, "catalogueLinks", "catalogueLink"):
+            link_name = link.get("name", "")
+            # Mapper les noms BattleScribe vers les IDs de faction
+            if "Imperial Knights" in link_name:
+                allied_factions.append("QI")
+            elif "Agents of the Imperium" in link_name:
+                allied_factions.append("AoI")
+            elif "Space Marines" in link_name and faction_name not in link_name:
+                allied_factions.append("SM")
         
         faction_info["allied_factions"] = allied_factions
         
         return faction_info
     
-    def extract_abilities(self, selection_entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Extrait les capacités d'une unité"""
-        abilities = {
+    def new_abilities(self) -> Dict[str, Any]:
+        """Retourne la structure de capacités vide d'une datasheet"""
+        return {
             "core": [],
             "faction": ["Oath of Moment"],
             "other": [],
@@ -274,295 +531,167 @@ class BattleScribeTransformer:
                 "value": "5+"
             }
         }
-        
-        # Traitement des infoLinks (règles partagées)
-        info_links_key = self.find_key_with_prefix(selection_entry, "infoLinks")
-        if info_links_key:
-            info_links = selection_entry[info_links_key]
-            info_link_key = self.find_key_with_prefix(info_links, "infoLink")
-            
-            if info_link_key:
-                info_link_list = info_links[info_link_key] if isinstance(info_links[info_link_key], list) else [info_links[info_link_key]]
-                
-                for info_link in info_link_list:
-                    rule_name = info_link.get("name", "")
-                    
-                    # Traitement des modificateurs pour les règles comme "Deadly Demise D3"
-                    if "modifiers" in info_link:
-                        modifiers = info_link["modifiers"]
-                        modifier_key = self.find_key_with_prefix(modifiers, "modifier")
-                        
-                        if modifier_key:
-                            modifier_list = modifiers[modifier_key] if isinstance(modifiers[modifier_key], list) else [modifiers[modifier_key]]
-                            
-                            for modifier in modifier_list:
-                                if modifier.get("type") == "append" and modifier.get("field") == "name":
-                                    rule_name += modifier.get("value", "")
-                    
-                    # Ajouter la règle aux capacités core si elle est dans les règles partagées
-                    if rule_name in self.shared_rules:
-                        abilities["core"].append(rule_name)
-                    else:
-                        # Pour les règles non partagées, les ajouter aux capacités other
-                        abilities["other"].append({
-                            "name": rule_name,
-                            "description": "",  # Pas de description disponible dans infoLinks
-                            "showAbility": True,
-                            "showDescription": False
-                        })
-        
-        # Recherche des profils avec les préfixes de namespace
-        profiles_key = self.find_key_with_prefix(selection_entry, "profiles")
-        
-        if profiles_key:
-            profiles = selection_entry[profiles_key]
+    
+    def add_linked_abilities(self, selection_entry: Dict[str, Any], abilities: Dict[str, Any]):
+        """Ajoute les capacités référencées par les infoLinks (règles partagées)"""
+        for info_link in self.get_collection(selection_entry, "infoLinks", "infoLink"):
+            rule_name = info_link.get("name", "")
             
-            # Recherche de profile dans les clés
-            profile_key = self.find_key_with_prefix(profiles, "profile")
+            # Traitement des modificateurs pour les règles comme "Deadly Demise D3"
+            for modifier in self.get_collection(info_link, "modifiers", "modifier"):
+                if modifier.get("type") == "append" and modifier.get("field") == "name":
+                    rule_name += modifier.get("value", "")
             
-            if profile_key:
-                profile_list = profiles[profile_key] if isinstance(profiles[profile_key], list) else [profiles[profile_key]]
+            # Ajouter la règle aux capacités core si elle est dans les règles partagées
+            if rule_name in self.shared_rules:
+                abilities["core"].append(rule_name)
+            else:
+                # Pour les règles non partagées, les ajouter aux capacités other
+                # (la description n'est disponible qu'en suivant le lien)
+                description = self.registry.describe(info_link) if self.registry else ""
+                abilities["other"].append({
+                    "name": rule_name,
+                    "description": description,
+                    "showAbility": True,
+                    "showDescription": bool(description)
+                })
+    
+    def visit_ability_profile(self, profile: Dict[str, Any], abilities: Dict[str, Any]):
+        """Ajoute un profil de type Abilities aux capacités"""
+        type_id = profile.get("typeId")
+        for c in self.get_collection(profile, "characteristics", "characteristic"):
+            if self.profile_types.field(type_id, c) == "description":
+                ability_name = profile.get("name", "")
+                ability_description = c.get("_text", "")
                 
-                for profile in profile_list:
-                    if profile.get("typeId") == "9cc3-6d83-4dd3-9b64":  # Abilities profile type
-                        # Recherche des caractéristiques
-                        characteristics_key = self.find_key_with_prefix(profile, "characteristics")
-                        
-                        if characteristics_key:
-                            characteristics = profile[characteristics_key]
-                            
-                            # Recherche de characteristic dans les clés
-                            characteristic_key = self.find_key_with_prefix(characteristics, "characteristic")
-                            
-                            if characteristic_key:
-                                char = characteristics[characteristic_key]
-                                if isinstance(char, list):
-                                    for c in char:
-                                        if c.get("name") == "Description":
-                                            ability_name = profile.get("name", "")
-                                            ability_description = c.get("_text", "")
-                                            
-                                            # Déterminer où placer la capacité
-                                            if ability_name in self.shared_rules:
-                                                abilities["core"].append(ability_name)
-                                            else:
-                                                abilities["other"].append({
-                                                    "name": ability_name,
-                                                    "description": ability_description,
-                                                    "showAbility": True,
-                                                    "showDescription": True
-                                                })
-                                else:
-                                    if char.get("name") == "Description":
-                                        ability_name = profile.get("name", "")
-                                        ability_description = char.get("_text", "")
-                                        
-                                        # Déterminer où placer la capacité
-                                        if ability_name in self.shared_rules:
-                                            abilities["core"].append(ability_name)
-                                        else:
-                                            abilities["other"].append({
-                                                "name": ability_name,
-                                                "description": ability_description,
-                                                "showAbility": True,
-                                                "showDescription": True
-                                            })
-        
-        return abilities
+                # Déterminer où placer la capacité
+                if ability_name in self.shared_rules:
+                    abilities["core"].append(ability_name)
+                else:
+                    abilities["other"].append({
+                        "name": ability_name,
+                        "description": ability_description,
+                        "showAbility": True,
+                        "showDescription": True
+                    })
     
-    def extract_stats(self, selection_entry: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extrait les statistiques d'une unité"""
-        stats = []
+    def visit_unit_profile(self, profile: Dict[str, Any], stats: List[Dict[str, Any]]):
+        """Ajoute un profil de type Unit aux statistiques"""
+        stat = {
+            "active": True,
+            "name": profile.get("name", ""),
+            "showName": False,
+            "showDamagedMarker": False
+        }
         
-        # Recherche des profils avec les préfixes de namespace
-        profiles_key = self.find_key_with_prefix(selection_entry, "profiles")
+        type_id = profile.get("typeId")
+        for char in self.get_collection(profile, "characteristics", "characteristic"):
+            field = self.profile_types.field(type_id, char)
+            if field:
+                stat[field] = char.get("_text", "")
         
-        if profiles_key:
-            profiles = selection_entry[profiles_key]
-            
-            # Recherche de profile dans les clés
-            profile_key = self.find_key_with_prefix(profiles, "profile")
-            
-            if profile_key:
-                profile_list = profiles[profile_key] if isinstance(profiles[profile_key], list) else [profiles[profile_key]]
-                
-                for profile in profile_list:
-                    if profile.get("typeId") == "c547-1836-d8a-ff4f":  # Unit profile type
-                        stat = {
-                            "active": True,
-                            "name": profile.get("name", ""),
-                            "showName": False,
-                            "showDamagedMarker": False
-                        }
-                        
-                        # Recherche des caractéristiques
-                        characteristics_key = self.find_key_with_prefix(profile, "characteristics")
-                        
-                        if characteristics_key:
-                            characteristics = profile[characteristics_key]
-                            
-                            # Recherche de characteristic dans les clés
-                            characteristic_key = self.find_key_with_prefix(characteristics, "characteristic")
-                            
-                            if characteristic_key:
-                                chars = characteristics[characteristic_key]
-                                if isinstance(chars, list):
-                                    for char in chars:
-                                        if char.get("name") == "M":
-                                            stat["m"] = char.get("_text", "")
-                                        elif char.get("name") == "T":
-                                            stat["t"] = char.get("_text", "")
-                                        elif char.get("name") == "SV":
-                                            stat["sv"] = char.get("_text", "")
-                                        elif char.get("name") == "W":
-                                            stat["w"] = char.get("_text", "")
-                                        elif char.get("name") == "LD":
-                                            stat["ld"] = char.get("_text", "")
-                                        elif char.get("name") == "OC":
-                                            stat["oc"] = char.get("_text", "")
-                                else:
-                                    if chars.get("name") == "M":
-                                        stat["m"] = chars.get("_text", "")
-                                    elif chars.get("name") == "T":
-                                        stat["t"] = chars.get("_text", "")
-                                    elif chars.get("name") == "SV":
-                                        stat["sv"] = chars.get("_text", "")
-                                    elif chars.get("name") == "W":
-                                        stat["w"] = chars.get("_text", "")
-                                    elif chars.get("name") == "LD":
-                                        stat["ld"] = chars.get("_text", "")
-                                    elif chars.get("name") == "OC":
-                                        stat["oc"] = chars.get("_text", "")
-                        
-                        if stat["name"]:  # Seulement ajouter si on a un nom
-                            stats.append(stat)
-        
-        return stats
+        if stat["name"]:  # Seulement ajouter si on a un nom
+            stats.append(stat)
     
-    def extract_weapons(self, selection_entry: Dict[str, Any], weapon_type: str) -> List[Dict[str, Any]]:
-        """Extrait les armes d'une unité"""
-        weapons = []
+    def visit_weapon_profile(self, profile: Dict[str, Any], weapon_groups: Dict[str, Dict[str, Any]]):
+        """Ajoute un profil d'arme à son groupe (les profils sont groupés par nom d'arme)"""
+        weapon_name = profile.get("name", "")
+        if weapon_name not in weapon_groups:
+            weapon_groups[weapon_name] = {
+                "active": True,
+                "profiles": []
+            }
         
-        # Recherche des selectionEntries imbriqués
-        selection_entries_key = self.find_key_with_prefix(selection_entry, "selectionEntries")
+        weapon_profile = {
+            "active": True,
+            "name": weapon_name
+        }
         
-        if selection_entries_key:
-            selection_entries = selection_entry[selection_entries_key]
-            
-            # Recherche de selectionEntry dans les clés
-            selection_entry_key = self.find_key_with_prefix(selection_entries, "selectionEntry")
-            
-            if selection_entry_key:
-                entries_list = selection_entries[selection_entry_key] if isinstance(selection_entries[selection_entry_key], list) else [selection_entries[selection_entry_key]]
-                
-                # Grouper les profils par arme
-                weapon_groups = {}
-                
-                for entry in entries_list:
-                    # Recherche des profils dans chaque selectionEntry
-                    profiles_key = self.find_key_with_prefix(entry, "profiles")
-                    
-                    if profiles_key:
-                        profiles = entry[profiles_key]
-                        
-                        # Recherche de profile dans les clés
-                        profile_key = self.find_key_with_prefix(profiles, "profile")
-                        
-                        if profile_key:
-                            profile_list = profiles[profile_key] if isinstance(profiles[profile_key], list) else [profiles[profile_key]]
-                            
-                            for profile in profile_list:
-                                profile_type_id = profile.get("typeId")
-                                if (weapon_type == "ranged" and profile_type_id == "f77d-b953-8fa4-b762") or \
-                                   (weapon_type == "melee" and profile_type_id == "8a40-4aaa-c780-9046"):
-                                    
-                                    weapon_name = profile.get("name", "")
-                                    if weapon_name not in weapon_groups:
-                                        weapon_groups[weapon_name] = {
-                                            "active": True,
-                                            "profiles": []
-                                        }
-                                    
-                                    weapon_profile = {
-                                        "active": True,
-                                        "name": weapon_name
-                                    }
-                                    
-                                    # Recherche des caractéristiques
-                                    characteristics_key = self.find_key_with_prefix(profile, "characteristics")
-                                    
-                                    if characteristics_key:
-                                        characteristics = profile[characteristics_key]
-                                        
-                                        # Recherche de characteristic dans les clés
-                                        characteristic_key = self.find_key_with_prefix(characteristics, "characteristic")
-                                        
-                                        if characteristic_key:
-                                            chars = characteristics[characteristic_key]
-                                            if isinstance(chars, list):
-                                                for char in chars:
-                                                    if char.get("name") == "Range":
-                                                        weapon_profile["range"] = char.get("_text", "")
-                                                    elif char.get("name") == "A":
-                                                        weapon_profile["attacks"] = char.get("_text", "")
-                                                    elif char.get("name") == "BS":
-                                                        weapon_profile["skill"] = char.get("_text", "")
-                                                    elif char.get("name") == "S":
-                                                        weapon_profile["strength"] = char.get("_text", "")
-                                                    elif char.get("name") == "AP":
-                                                        weapon_profile["ap"] = char.get("_text", "")
-                                                    elif char.get("name") == "D":
-                                                        weapon_profile["damage"] = char.get("_text", "")
-                                                    elif char.get("name") == "Keywords":
-                                                        keywords_text = char.get("_text", "")
-                                                        if keywords_text:
-                                                            weapon_profile["keywords"] = [k.strip() for k in keywords_text.split(",")]
-                                            else:
-                                                if chars.get("name") == "Range":
-                                                    weapon_profile["range"] = chars.get("_text", "")
-                                                elif chars.get("name") == "A":
-                                                    weapon_profile["attacks"] = chars.get("_text", "")
-                                                elif chars.get("name") == "BS":
-                                                    weapon_profile["skill"] = chars.get("_text", "")
-                                                elif chars.get("name") == "S":
-                                                    weapon_profile["strength"] = chars.get("_text", "")
-                                                elif chars.get("name") == "AP":
-                                                    weapon_profile["ap"] = chars.get("_text", "")
-                                                elif chars.get("name") == "D":
-                                                    weapon_profile["damage"] = chars.get("_text", "")
-                                                elif chars.get("name") == "Keywords":
-                                                    keywords_text = chars.get("_text", "")
-                                                    if keywords_text:
-                                                        weapon_profile["keywords"] = [k.strip() for k in keywords_text.split(",")]
-                                    
-                                    weapon_groups[weapon_name]["profiles"].append(weapon_profile)
-                
-                weapons = list(weapon_groups.values())
+        type_id = profile.get("typeId")
+        for char in self.get_collection(profile, "characteristics", "characteristic"):
+            field = self.profile_types.field(type_id, char)
+            if field == "keywords":
+                keywords_text = char.get("_text", "")
+                if keywords_text:
+                    weapon_profile["keywords"] = [k.strip() for k in keywords_text.split(",")]
+            elif field:
+                weapon_profile[field] = char.get("_text", "")
+        
+        weapon_groups[weapon_name]["profiles"].append(weapon_profile)
+    
+    def visit_entry(self, selection_entry: Dict[str, Any], wanted=PROFILE_BUCKETS) -> Dict[str, Any]:
+        """Parcourt une seule fois les profils d'une entrée et les répartit par typeId
+        
+        Les profils propres à l'entrée alimentent les capacités et statistiques,
+        ceux des entrées d'équipement les armes (voir PROFILE_TYPE_CONFIG). wanted
+        limite le parcours à certains paquets.
+        """
+        buckets = {
+            "abilities": self.new_abilities(),
+            "stats": [],
+            "rangedWeapons": {},
+            "meleeWeapons": {}
+        }
+        
+        if "abilities" in wanted:
+            self.add_linked_abilities(selection_entry, buckets["abilities"])
+        
+        # Profils de l'entrée elle-même
+        visitors = self.profile_types.visitors
+        for profile in self.get_collection(selection_entry, "profiles", "profile"):
+            visitor = visitors.get(profile.get("typeId"))
+            if visitor and visitor[0] in wanted and visitor[0] in ENTRY_BUCKETS:
+                getattr(self, visitor[1])(profile, buckets[visitor[0]])
+        
+        # Profils des entrées d'équipement (armes)
+        if any(bucket in wanted for bucket in WARGEAR_BUCKETS):
+            for entry in self.iter_wargear_entries(selection_entry):
+                for profile in self.iter_entry_profiles(entry):
+                    visitor = visitors.get(profile.get("typeId"))
+                    if visitor and visitor[0] in wanted and visitor[0] in WARGEAR_BUCKETS:
+                        getattr(self, visitor[1])(profile, buckets[visitor[0]])
+        
+        for bucket in WARGEAR_BUCKETS:
+            buckets[bucket] = list(buckets[bucket].values())
         
-        return weapons
+        return buckets
+    
+    def extract_abilities(self, selection_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrait les capacités d'une unité"""
+        return self.visit_entry(selection_entry, ("abilities",))["abilities"]
+    
+    def extract_stats(self, selection_entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extrait les statistiques d'une unité"""
+        return self.visit_entry(selection_entry, ("stats",))["stats"]
+    
+    def iter_wargear_entries(self, selection_entry: Dict[str, Any]):
+        """Parcourt les selectionEntries d'équipement d'une unité
+        
+        Sans registre, seules les entrées imbriquées sont lues ; avec registre, les
+        groupes et les entryLinks vers les bibliothèques sont également suivis.
+        """
+        if self.registry:
+            return self.registry.iter_entries(selection_entry)
+        return iter(self.get_collection(selection_entry, "selectionEntries", "selectionEntry"))
+    
+    def iter_entry_profiles(self, entry: Dict[str, Any]):
+        """Parcourt les profils d'une entrée (et ceux liés par infoLink avec registre)"""
+        if self.registry:
+            return self.registry.iter_profiles(entry)
+        return iter(self.get_collection(entry, "profiles", "profile"))
+    
+    def extract_weapons(self, selection_entry: Dict[str, Any], weapon_type: str) -> List[Dict[str, Any]]:
+        """Extrait les armes d'une unité"""
+        bucket = "rangedWeapons" if weapon_type == "ranged" else "meleeWeapons"
+        return self.visit_entry(selection_entry, (bucket,))[bucket]
     
     def extract_keywords(self, selection_entry: Dict[str, Any]) -> List[str]:
         """Extrait les mots-clés d'une unité"""
         keywords = []
         
-        # Recherche des liens de catégorie avec les préfixes de namespace
-        category_links_key = self.find_key_with_prefix(selection_entry, "categoryLinks")
-        
-        if category_links_key:
-            category_links = selection_entry[category_links_key]
-            
-            # Recherche de categoryLink dans les clés
-            category_link_key = self.find_key_with_prefix(category_links, "categoryLink")
-            
-            if category_link_key:
-                links = category_links[category_link_key]
-                if isinstance(links, list):
-                    for link in links:
-                        if "name" in link:
-                            keywords.append(link["name"])
-                else:
-                    if "name" in links:
-                        keywords.append(links["name"])
+        for link in self.get_collection(selection_entry, "categoryLinks", "categoryLink"):
+            if "name" in link:
+                keywords.append(link["name"])
         
         return keywords
     
@@ -570,25 +699,13 @@ class BattleScribeTransformer:
         """Extrait les points d'une unité"""
         points = []
         
-        # Recherche des coûts avec les préfixes de namespace
-        costs_key = self.find_key_with_prefix(selection_entry, "costs")
-        
-        if costs_key:
-            costs = selection_entry[costs_key]
-            
-            # Recherche de cost dans les clés
-            cost_key = self.find_key_with_prefix(costs, "cost")
-            
-            if cost_key:
-                cost_list = costs[cost_key] if isinstance(costs[cost_key], list) else [costs[cost_key]]
-                
-                for cost in cost_list:
-                    if cost.get("name") == "pts":
-                        points.append({
-                            "name": "model",
-                            "model": "1",
-                            "cost": cost.get("value", "0")
-                        })
+        for cost in self.get_collection(selection_entry, "costs", "cost"):
+            if cost.get("name") == "pts":
+                points.append({
+                    "name": "model",
+                    "model": "1",
+                    "cost": cost.get("value", "0")
+                })
         
         return points
     
@@ -597,17 +714,20 @@ class BattleScribeTransformer:
         if selection_entry.get("type") != "model":
             return None
         
+        # Un seul parcours des profils pour les capacités, statistiques et armes
+        profiles = self.visit_entry(selection_entry)
+        
         datasheet = {
-            "id": str(uuid.uuid4()),
+            "id": self.make_id("datasheet", selection_entry),
             "name": selection_entry.get("name", ""),
             "cardType": "DataCard",
             "factions": ["Dark Angels"],
             "faction_id": "CHDA",
             "source": "40k-10e",
-            "abilities": self.extract_abilities(selection_entry),
-            "stats": self.extract_stats(selection_entry),
-            "rangedWeapons": self.extract_weapons(selection_entry, "ranged"),
-            "meleeWeapons": self.extract_weapons(selection_entry, "melee"),
+            "abilities": profiles["abilities"],
+            "stats": profiles["stats"],
+            "rangedWeapons": profiles["rangedWeapons"],
+            "meleeWeapons": profiles["meleeWeapons"],
             "keywords": self.extract_keywords(selection_entry),
             "points": self.extract_points(selection_entry),
             "composition": [f"1 {selection_entry.get('name', '')}"],
@@ -627,7 +747,7 @@ class BattleScribeTransformer:
         
         enhancement = {
             "name": selection_entry.get("name", ""),
-            "id": str(uuid.uuid4()),
+            "id": self.make_id("enhancement", selection_entry),
             "cost": "0",
             "keywords": ["Dark Angels"],
             "excludes": [],
@@ -639,22 +759,12 @@ class BattleScribeTransformer:
         }
         
         # Extraction de la description depuis les profils
-        if "profiles" in selection_entry:
-            profiles = selection_entry["profiles"]
-            if isinstance(profiles, dict) and "profile" in profiles:
-                profile_list = profiles["profile"] if isinstance(profiles["profile"], list) else [profiles["profile"]]
-                
-                for profile in profile_list:
-                    if profile.get("typeId") == "9cc3-6d83-4dd3-9b64":  # Abilities profile type
-                        if "characteristics" in profile and "characteristic" in profile["characteristics"]:
-                            char = profile["characteristics"]["characteristic"]
-                            if isinstance(char, list):
-                                for c in char:
-                                    if c.get("name") == "Description":
-                                        enhancement["description"] = c.get("_text", "")
-                            else:
-                                if char.get("name") == "Description":
-                                    enhancement["description"] = char.get("_text", "")
+        for profile in self.get_collection(selection_entry, "profiles", "profile"):
+            if self.profile_types.bucket(profile) == "abilities":
+                type_id = profile.get("typeId")
+                for c in self.get_collection(profile, "characteristics", "characteristic"):
+                    if self.profile_types.field(type_id, c) == "description":
+                        enhancement["description"] = c.get("_text", "")
         
         return enhancement
     
@@ -707,72 +817,134 @@ class BattleScribeTransformer:
         
         return rules
     
-    def transform_data(self) -> Dict[str, Any]:
-        """Transforme les données source vers le format cible"""
-        print("Début de la transformation...")
+    def cache_context(self) -> str:
+        """Empreinte de tout ce qui, hors entrée elle-même, influe sur l'extraction"""
+        context = {
+            "version": TRANSFORMER_VERSION,
+            "source": convert_xml.dump_stem(self.source_file),
+            "shared_rules": sorted(self.shared_rules),
+            "profile_visitors": sorted(self.profile_types.visitors.items()),
+            "profile_fields": sorted(self.profile_types.fields.items()),
+            # Les nœuds liés eux-mêmes sont vérifiés entrée par entrée (EntryCache.get)
+            "links": self.registry is not None
+        }
+        payload = json.dumps(context, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def node_hash(self, node_id: str) -> Optional[str]:
+        """Empreinte d'un nœud du registre (None s'il est introuvable), calculée une fois"""
+        if node_id not in self.node_hashes:
+            node = self.registry.get(node_id) if self.registry else None
+            self.node_hashes[node_id] = EntryCache.entry_key(node) if node is not None else None
+        return self.node_hashes[node_id]
+    
+    def extract_entry(self, entry: Dict[str, Any]):
+        """Extrait (datasheet, enhancement, dépendances) d'une entrée
+        
+        Les dépendances associent à chaque nœud du registre résolu pendant
+        l'extraction son empreinte actuelle.
+        """
+        tracking = self.registry.tracking() if self.registry else contextlib.nullcontext(set())
+        with tracking as resolved:
+            datasheet = self.extract_datasheet(entry)
+            enhancement = self.extract_enhancements(entry)
+        dependencies = {node_id: self.node_hash(node_id) for node_id in sorted(resolved)}
+        return datasheet, enhancement, dependencies
+    
+    def open_cache(self) -> Optional[EntryCache]:
+        """Ouvre le cache par entrée de la source, si un répertoire de cache est configuré"""
+        if not self.cache_dir:
+            return None
+        cache_file = Path(self.cache_dir) / (convert_xml.dump_stem(self.source_file) + ".cache.json")
+        return EntryCache(str(cache_file), self.cache_context())
+    
+    def begin_transform(self) -> Optional[Dict[str, Any]]:
+        """Charge la source et extrait les informations de faction (None en cas d'échec)"""
+        self.reporter.verbose("Début de la transformation...")
         
         # Chargement des fichiers
-        self.source_data = self.load_json_file(self.source_file)
+        with self.reporter.phase("parse"):
+            self.load_source()
         
         if not self.source_data:
-            print("✗ Impossible de charger le fichier source")
-            return {}
+            self.reporter.error("✗ Impossible de charger le fichier source")
+            return None
         
         # Extraction des informations de base
-        faction_info = self.extract_faction_info()
-        
-        # Extraction des datasheets
-        datasheets = []
-        enhancements = []
-        
+        with self.reporter.phase("extract_faction_info"):
+            return self.extract_faction_info()
+    
+    def iter_entries(self):
+        """Extrait les sharedSelectionEntries une à une et produit (datasheet, enhancement)"""
         # Recherche des sharedSelectionEntries avec les préfixes de namespace
         shared_entries_key = self.find_key_with_prefix(self.source_data, "sharedSelectionEntries")
         
-        if shared_entries_key:
-            shared_entries = self.source_data[shared_entries_key]
-            print(f"Trouvé sharedSelectionEntries: {shared_entries_key}")
+        if not shared_entries_key:
+            self.reporter.info("Aucun sharedSelectionEntries trouvé")
+            return
+        
+        self.reporter.verbose(f"Trouvé sharedSelectionEntries: {shared_entries_key}")
+        
+        entries = self.get_collection(self.source_data, "sharedSelectionEntries", "selectionEntry")
+        if entries:
+            self.reporter.verbose(f"Trouvé {len(entries)} entrées")
+        
+        cache = self.open_cache()
+        label = convert_xml.dump_stem(self.source_file)
+        
+        for done, entry in enumerate(entries, 1):
+            self.reporter.verbose(f"Traitement de: {entry.get('name', 'Unknown')} (type: {entry.get('type', 'Unknown')})")
+            self.reporter.count("entries")
             
-            # Recherche de selectionEntry dans les clés
-            selection_entry_key = self.find_key_with_prefix(shared_entries, "selectionEntry")
+            # Réutiliser le résultat mis en cache si l'entrée n'a pas changé
+            cache_key = EntryCache.entry_key(entry) if cache else None
+            cached = cache.get(cache_key, self.node_hash) if cache else None
+            if cached is not None:
+                datasheet = cached["datasheet"]
+                enhancement = cached["enhancement"]
+            else:
+                # Extraction des datasheets et des enhancements
+                start = time.perf_counter()
+                datasheet, enhancement, dependencies = self.extract_entry(entry)
+                self.reporter.add_phase("extract", time.perf_counter() - start)
+                if cache:
+                    cache.put(cache_key, datasheet, enhancement, dependencies)
             
-            if selection_entry_key:
-                entries = shared_entries[selection_entry_key]
-                print(f"Trouvé {len(entries) if isinstance(entries, list) else 1} entrées")
-                
-                if isinstance(entries, list):
-                    for entry in entries:
-                        print(f"Traitement de: {entry.get('name', 'Unknown')} (type: {entry.get('type', 'Unknown')})")
-                        
-                        # Extraction des datasheets
-                        datasheet = self.extract_datasheet(entry)
-                        if datasheet:
-                            datasheets.append(datasheet)
-                            print(f"  ✓ Datasheet extraite: {datasheet['name']}")
-                        
-                        # Extraction des enhancements
-                        enhancement = self.extract_enhancements(entry)
-                        if enhancement:
-                            enhancements.append(enhancement)
-                            print(f"  ✓ Enhancement extrait: {enhancement['name']}")
-                else:
-                    print(f"Traitement de: {entries.get('name', 'Unknown')} (type: {entries.get('type', 'Unknown')})")
-                    
-                    # Extraction des datasheets
-                    datasheet = self.extract_datasheet(entries)
-                    if datasheet:
-                        datasheets.append(datasheet)
-                        print(f"  ✓ Datasheet extraite: {datasheet['name']}")
-                    
-                    # Extraction des enhancements
-                    enhancement = self.extract_enhancements(entries)
-                    if enhancement:
-                        enhancements.append(enhancement)
-                        print(f"  ✓ Enhancement extrait: {enhancement['name']}")
-        else:
-            print("Aucun sharedSelectionEntries trouvé")
+            if datasheet:
+                self.reporter.verbose(f"  ✓ Datasheet extraite: {datasheet['name']}")
+                self.reporter.count("datasheets")
+            if enhancement:
+                self.reporter.verbose(f"  ✓ Enhancement extrait: {enhancement['name']}")
+                self.reporter.count("enhancements")
+            self.reporter.progress(done, len(entries), label)
+            
+            yield datasheet, enhancement
+        
+        if cache:
+            cache.save()
+            self.reporter.count("cache_hits", cache.hits)
+            self.reporter.count("cache_misses", cache.misses)
+            self.reporter.info(f"✓ Cache: {cache.hits} entrées réutilisées, {cache.misses} recalculées")
+    
+    def transform_data(self) -> Dict[str, Any]:
+        """Transforme les données source vers le format cible"""
+        faction_info = self.begin_transform()
+        if faction_info is None:
+            return {}
+        
+        # Extraction des datasheets
+        datasheets = []
+        enhancements = []
+        
+        for datasheet, enhancement in self.iter_entries():
+            if datasheet:
+                datasheets.append(datasheet)
+            if enhancement:
+                enhancements.append(enhancement)
         
         # Extraction des règles
-        rules = self.extract_rules()
+        with self.reporter.phase("extract_rules"):
+            rules = self.extract_rules()
         
         # Construction du résultat final
         result = {
@@ -782,44 +954,341 @@ class BattleScribeTransformer:
             "rules": rules
         }
         
-        print(f"✓ Transformation terminée: {len(datasheets)} datasheets, {len(enhancements)} enhancements")
+        self.reporter.info(f"✓ Transformation terminée: {len(datasheets)} datasheets, {len(enhancements)} enhancements")
         return result
     
-    def run(self):
-        """Exécute la transformation complète"""
-        print(f"Transformation de {self.source_file} vers {self.output_file}")
+    def stream_to_file(self, file_path: str) -> bool:
+        """Transforme la source en écrivant chaque datasheet dès qu'elle est extraite
+        
+        Produit le même document que transform_data + save_json_file, sans jamais
+        garder toutes les datasheets en mémoire (seuls les enhancements, peu
+        nombreux, sont conservés jusqu'à leur écriture).
+        """
+        faction_info = self.begin_transform()
+        if faction_info is None:
+            return False
+        
+        tmp_path = Path(file_path).with_name(Path(file_path).name + '.tmp')
+        try:
+            with convert_xml.open_output(tmp_path, self.compress) as f:
+                writer = StreamingJsonWriter(f, compact=self.output_format == "compact")
+                with self.reporter.detail("save"):
+                    for key, value in faction_info.items():
+                        writer.write_field(key, value)
+                
+                datasheet_count = 0
+                enhancements = []
+                writer.begin_list("datasheets")
+                for datasheet, enhancement in self.iter_entries():
+                    if datasheet:
+                        with self.reporter.detail("save"):
+                            writer.write_item(datasheet)
+                        datasheet_count += 1
+                    if enhancement:
+                        enhancements.append(enhancement)
+                with self.reporter.phase("extract_rules"):
+                    rules = self.extract_rules()
+                with self.reporter.detail("save"):
+                    writer.end_list()
+                    writer.write_field("enhancements", enhancements)
+                    writer.write_field("rules", rules)
+                    writer.close()
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            self.reporter.error(f"✗ Erreur lors de la sauvegarde de {file_path}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return False
         
-        # Charger les règles partagées
-        self.load_shared_rules()
+        self.reporter.info(f"✓ Transformation terminée: {datasheet_count} datasheets, {len(enhancements)} enhancements")
+        self.reporter.info(f"✓ Fichier sauvegardé: {file_path}")
+        return True
+    
+    def find_unit(self, unit: str) -> Optional[Dict[str, Any]]:
+        """Entrée partagée désignée par son id ou son nom (--unit)
+        
+        Lue depuis le magasin par entrée de la source lorsqu'il est à jour : seuls
+        l'index et cette entrée sont désérialisés, et la racine allégée du magasin
+        tient lieu d'arbre source. Sinon, la source est chargée en entier.
+        """
+        store = self.registry.store_for_file(self.source_file) if isinstance(self.registry, StoreRegistry) else None
+        opened = None  # Magasin ouvert pour cette seule lecture, fermé ensuite
+        if store is None and convert_xml.is_json_dump(self.source_file):
+            store = opened = convert_xml.EntryStore.open(self.source_file)
+        if store is not None:
+            try:
+                self.source_data = self.source_data or store.catalogue
+                node_id = store.find(unit)
+                return store.get(node_id) if node_id else None
+            finally:
+                if opened is not None:
+                    opened.close()
+        
+        self.reporter.info("⚠ Magasin par entrée absent ou périmé : lecture complète de la source")
+        entries = self.get_collection(self.load_source(), "sharedSelectionEntries", "selectionEntry")
+        for key in ("id", "name"):
+            for entry in entries:
+                if entry.get(key) == unit:
+                    return entry
+        return None
+    
+    def run_unit(self, unit: str) -> bool:
+        """Extrait une seule entrée et ses liens résolus, au format de sortie habituel"""
+        self.reporter.info(f"Extraction de {unit} depuis {self.source_file} vers {self.output_file}")
+        
+        if not self.shared_rules:
+            self.load_shared_rules()
+        
+        with self.reporter.phase("parse"):
+            entry = self.find_unit(unit)
+        if entry is None:
+            self.reporter.error(f"✗ Entrée introuvable : {unit}")
+            return False
+        
+        with self.reporter.phase("extract"):
+            datasheet = self.extract_datasheet(entry)
+            enhancement = self.extract_enhancements(entry)
+        with self.reporter.phase("extract_faction_info"):
+            faction_info = self.extract_faction_info()
+        
+        result = {
+            **faction_info,
+            "datasheets": [datasheet] if datasheet else [],
+            "enhancements": [enhancement] if enhancement else [],
+            "rules": self.extract_rules()
+        }
+        self.reporter.info(f"✓ {entry.get('name', unit)} ({entry.get('id')}, type: {entry.get('type', 'Unknown')}) : "
+                           f"{len(result['datasheets'])} datasheet, {len(result['enhancements'])} enhancement")
+        self.save_json_file(result, self.output_file)
+        return True
+    
+    def run(self) -> bool:
+        """Exécute la transformation complète (écriture en flux)"""
+        self.reporter.info(f"Transformation de {self.source_file} vers {self.output_file}")
         
-        transformed_data = self.transform_data()
+        # Charger les règles partagées (sauf si elles ont été fournies, ex. mode batch)
+        if not self.shared_rules:
+            self.load_shared_rules()
         
-        if transformed_data:
-            self.save_json_file(transformed_data, self.output_file)
-            print("✓ Transformation réussie!")
+        if self.stream_to_file(self.output_file):
+            self.reporter.info("✓ Transformation réussie!")
+            return True
         else:
-            print("✗ Échec de la transformation")
+            self.reporter.error("✗ Échec de la transformation")
+            return False
+
+# État partagé du mode batch : chargé une fois dans le processus parent avant le
+# fork, puis hérité par les workers (ou rechargé par l'initialiseur en mode spawn)
+_BATCH_STATE: Dict[str, Any] = {}
+
+def _init_batch_state(catalogues_dir: Optional[str], game_system_file: str, use_links: bool):
+    """Charge le système de jeu et l'index des catalogues une seule fois par processus"""
+    if _BATCH_STATE:
+        return
+    registry = CatalogueRegistry.from_directory(catalogues_dir) if use_links and catalogues_dir else None
+    loader = BattleScribeTransformer(game_system_file, "", game_system_file=game_system_file,
+                                     reporter=reporting.Reporter(reporting.QUIET, show_progress=False))
+    loader.load_shared_rules()
+    _BATCH_STATE["registry"] = registry
+    _BATCH_STATE["shared_rules"] = loader.shared_rules
+    _BATCH_STATE["profile_types"] = loader.profile_types
+
+def _transform_task(args):
+    """Transforme une faction dans un worker et retourne (succès, messages (niveau, texte), métriques)"""
+    source_file, output_file, level, profile, options = args
+    registry = _BATCH_STATE.get("registry")
+    source_data = registry.catalogue_for_file(source_file) if registry else None
+    
+    # Canal propre à la tâche, au niveau du parent : les messages sont enregistrés, sans progression
+    reporter = reporting.Reporter(level, show_progress=False)
+    reporter.profile = profile
+    events = reporter.record()
+    previous = reporting.get_reporter()
+    reporting.set_reporter(reporter)
+    try:
+        transformer = BattleScribeTransformer(source_file, output_file, source_data=source_data,
+                                              registry=registry, reporter=reporter, **options)
+        transformer.shared_rules = set(_BATCH_STATE.get("shared_rules", ()))
+        transformer.profile_types = _BATCH_STATE.get("profile_types", transformer.profile_types)
+        # Sans l'en-tête et le bilan de run() : le parent affiche « ✓ faction -> sortie »
+        ok = transformer.stream_to_file(output_file)
+    except Exception as e:
+        reporter.error(f"✗ Erreur inattendue: {e}")
+        ok = False
+    finally:
+        reporting.set_reporter(previous)
+    return ok, events, reporter.metrics()
+
+def run_batch(source_files: List[str], output_dir: str, jobs: int,
+              catalogues_dir: Optional[str], game_system_file: str, use_links: bool = True,
+              cache_dir: Optional[str] = None, output_format: str = "pretty",
+              compress: Optional[str] = None) -> List[str]:
+    """Transforme plusieurs factions dans un pool de processus et retourne les échecs"""
+    reporter = reporting.get_reporter()
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    options = {"cache_dir": cache_dir, "output_format": output_format, "compress": compress}
+    suffix = convert_xml.json_suffix(compress)
+    tasks = [(source, str(Path(output_dir) / (convert_xml.dump_stem(source) + suffix)), reporter.level,
+              reporter.profile, options)
+             for source in source_files]
+    
+    # Charger une seule fois avant de créer les workers (partagés par fork)
+    with reporter.phase("registry"):
+        _init_batch_state(catalogues_dir, game_system_file, use_links)
+    registry = _BATCH_STATE["registry"]
+    if registry:
+        reporter.info(f"✓ Index des catalogues: {len(registry.catalogues)} catalogues, {len(registry)} nœuds partagés")
+    reporter.info(f"✓ Chargé {len(_BATCH_STATE['shared_rules'])} règles partagées")
+    
+    if jobs > 1 and len(tasks) > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(tasks)),
+                                           mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=_init_batch_state,
+                                           initargs=(catalogues_dir, game_system_file, use_links))
+        with executor:
+            results = []
+            for result in executor.map(_transform_task, tasks):
+                results.append(result)
+                reporter.progress(len(results), len(tasks), "Factions")
+    else:
+        results = []
+        for task in tasks:
+            results.append(_transform_task(task))
+            reporter.progress(len(results), len(tasks), "Factions")
+    
+    failures = []
+    for (source, output, *_), (ok, events, metrics) in zip(tasks, results):
+        reporter.merge(metrics)
+        status = "✓" if ok else "✗"
+        reporter.log(reporting.INFO if ok else reporting.QUIET, f"{status} {convert_xml.dump_stem(source)} -> {output}")
+        # Messages du worker, chacun à son niveau
+        for level, message in events:
+            reporter.log(level, f"    {message}")
+        if not ok:
+            failures.append(source)
+    reporter.count("factions", len(tasks) - len(failures))
+    
+    reporter.info(f"\n{len(tasks) - len(failures)}/{len(tasks)} factions transformées")
+    return failures
 
 def main():
     """Fonction principale"""
     parser = argparse.ArgumentParser(description='Transforme les données BattleScribe vers le format JSON simplifié')
-    parser.add_argument('--source', type=str, required=True, help='Chemin vers le fichier source JSON')
-    parser.add_argument('--output', type=str, required=True, help='Chemin vers le fichier de sortie JSON')
+    sources = parser.add_mutually_exclusive_group(required=True)
+    sources.add_argument('--source', type=str,
+                         help='Chemin vers le fichier source (JSON brut, ou .cat/.gst/.catz lu directement)')
+    sources.add_argument('--sources', type=str,
+                         help='Motif glob des fichiers sources à transformer en une seule exécution')
+    sources.add_argument('--all', action='store_true',
+                         help='Transforme tous les catalogues de faction connus du répertoire des catalogues')
+    parser.add_argument('--output', type=str, help='Chemin vers le fichier de sortie JSON (mode --source)')
+    parser.add_argument('--output-dir', type=str, default='output',
+                        help='Répertoire de sortie des modes --sources/--all')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help='Nombre de processus des modes --sources/--all (0 = nombre de CPU)')
+    parser.add_argument('--game-system', type=str, default=None,
+                        help='Fichier du système de jeu (.gst ou JSON), déduit de la source par défaut')
+    parser.add_argument('--catalogues', type=str, default=None,
+                        help='Répertoire des catalogues utilisés pour résoudre les liens (défaut : celui de la source)')
+    parser.add_argument('--no-links', action='store_true',
+                        help='Ne pas suivre les entryLinks/infoLinks vers les autres catalogues')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help="Répertoire du cache par entrée (seules les entrées modifiées sont recalculées)")
+    parser.add_argument('--unit', type=str, default=None, metavar='NOM/ID',
+                        help="Mode --source : n'extrait que cette entrée (nom ou id) et ses liens, "
+                             "depuis le magasin par entrée du convertisseur")
+    convert_xml.add_output_arguments(parser)
+    convert_xml.add_backend_argument(parser)
+    reporting.add_arguments(parser)
     
     args = parser.parse_args()
+    reporter = reporting.from_args(args, "transform_battlescribe")
+    try:
+        reporter.context["backend"] = convert_xml.set_backend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.unit and (args.sources or args.all):
+        parser.error("--unit n'est disponible qu'avec --source")
+    
+    # Modes batch : plusieurs factions dans un pool de processus
+    if args.sources or args.all:
+        if args.all:
+            catalogues_dir = args.catalogues or "SourceIntoJsonFormat"
+            source_files = [str(path) for path in sorted(Path(catalogues_dir).iterdir())
+                            if convert_xml.dump_stem(path) in FACTION_MAPPING
+                            and (convert_xml.is_json_dump(path) or convert_xml.is_xml_source(path))]
+        else:
+            source_files = sorted(glob.glob(args.sources))
+            catalogues_dir = args.catalogues or (str(Path(source_files[0]).parent) if source_files else None)
+        
+        if not source_files:
+            reporter.error("✗ Aucun fichier source trouvé")
+            return
+        
+        game_system_file = args.game_system or BattleScribeTransformer(source_files[0], "").resolve_game_system_file()
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        with reporting.session(args, reporter):
+            run_batch(source_files, args.output_dir, jobs, catalogues_dir, game_system_file, not args.no_links,
+                      args.cache_dir, args.output_format, args.compress)
+        if args.metrics_json:
+            reporter.write_metrics(args.metrics_json)
+        return
+    
+    if not args.output:
+        parser.error("--output est requis avec --source")
     
     # Vérification des fichiers
     if not Path(args.source).exists():
-        print(f"✗ Le fichier source {args.source} n'existe pas")
-        return
+        reporter.error(f"✗ Le fichier source {args.source} n'existe pas")
+        sys.exit(1)
     
     # Création du répertoire de sortie si nécessaire
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Exécution de la transformation
-    transformer = BattleScribeTransformer(args.source, args.output)
-    transformer.run()
+    # Exécution de la transformation (les magasins ouverts sont fermés en sortie)
+    with reporting.session(args, reporter), contextlib.ExitStack() as resources:
+        registry = None
+        source_data = None
+        if not args.no_links:
+            catalogues_dir = args.catalogues or str(Path(args.source).parent)
+            with reporter.phase("registry"):
+                # --unit : index des magasins des mêmes catalogues que la transformation
+                # complète, les nœuds liés sont lus à la demande
+                if args.unit:
+                    registry = resources.enter_context(StoreRegistry.from_source(catalogues_dir, args.source))
+                    if registry.missing:
+                        reporter.info(f"⚠ {len(registry.missing)} catalogues sans magasin par entrée à jour : "
+                                      f"chargement complet de l'index")
+                        registry.close()
+                        registry = None
+            if registry is None:
+                # Source lue une seule fois (phase parse), puis son système de jeu et ses catalogues liés
+                with reporter.phase("parse"):
+                    try:
+                        source_data = load_catalogue_file(args.source)
+                    except Exception as e:
+                        reporter.error(f"✗ Erreur lors du chargement de {args.source}: {e}")
+                        sys.exit(1)
+                with reporter.phase("registry"):
+                    registry = CatalogueRegistry.from_source(catalogues_dir, args.source, source_data)
+            reporter.info(f"✓ Index des catalogues: {len(registry.catalogues)} catalogues, {len(registry)} nœuds partagés")
+        
+        transformer = BattleScribeTransformer(args.source, args.output, source_data=source_data,
+                                              game_system_file=args.game_system, registry=registry, cache_dir=args.cache_dir,
+                                              output_format=args.output_format, compress=args.compress)
+        if args.unit:
+            ok = transformer.run_unit(args.unit)
+        else:
+            ok = transformer.run()
+    
+    if args.metrics_json:
+        reporter.write_metrics(args.metrics_json)
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file